@@ -5,6 +5,7 @@ import {
   extractTopics,
   findSimilarConversations,
 } from "@/lib/learning";
+import { resultContent } from "@/lib/upstash";
 import { getExternalKnowledge } from "@/lib/external-knowledge";
 
 const index = new Index({
@@ -216,6 +217,7 @@ What would you like to know? 😊`;
           data: enhancedQuery,
           topK: 20, // Increased to capture more relevant results
           includeMetadata: true,
+          includeData: true,
         });
 
         // Log search results for debugging
@@ -242,7 +244,7 @@ What would you like to know? 😊`;
           .filter((r) => (r.score || 0) > 0.5) // Only use results with good scores
           .map((r) => {
             // Only include content, NOT titles or types (to avoid LLM referencing section names)
-            const content = r.metadata?.content || r.metadata?.text || "";
+            const content = resultContent(r) || r.metadata?.text || "";
             return content;
           })
           .filter((part) => String(part).length > 10); // Filter out empty/short results
@@ -0,0 +1,30 @@
+"""
+pytest fixtures for test_mcp_server.py
+Hands each test its slice of a single batched vector query; pytest.ini runs
+the coroutine tests with pytest-asyncio on one session event loop
+"""
+
+import pytest
+
+from test_mcp_server import PROBES, fetch_test_results
+
+
+def pytest_generate_tests(metafunc):
+    """Run test_probe once per retrieval-only tool"""
+    if "tool" in metafunc.fixturenames:
+        metafunc.parametrize("tool", list(PROBES))
+
+
+@pytest.fixture(scope="session")
+def batched_results():
+    """Every test's vector query, run once per worker process"""
+    return fetch_test_results()
+
+
+@pytest.fixture
+def results(request, batched_results):
+    """This test's results from the batched vector query, keyed by tool name"""
+    callspec = getattr(request.node, "callspec", None)
+    if callspec is not None:
+        return batched_results[callspec.params["tool"]]
+    return batched_results[request.node.name.removeprefix("test_")]
@@ -5,77 +5,184 @@ Based on Binal's production implementation
 - Groq: Ultra-fast LLM inference
 """
 
+import asyncio
+import hashlib
 import os
-import json
+import sys
+import threading
+import time
+import orjson
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from dotenv import load_dotenv
-from upstash_vector import Index
-from groq import Groq
+from prompt_toolkit import PromptSession
+
+# Shared helpers live next to the MCP server
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from clients import create_groq_client, create_vector_index
+from ingest_state import BY_TYPE_FILE, read_ingest_hash, save_chunks_by_type, write_ingest_hash
+from local_index import LOCAL_INDEX_PATH, VECTOR_BACKEND, LocalIndex
+from response_cache import ResponseCache, prompt_namespace
+from results import result_content
+from vector_upload import batched, upsert_batch
+from semantic_cache import SemanticCache
 
 # Load environment variables
 load_dotenv()
 
 # Constants
 JSON_FILE = "digitaltwin.json"
+# Bump whenever chunking or the uploaded vector layout changes, so existing indexes re-ingest
+CHUNK_FORMAT_VERSION = 1
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 DEFAULT_MODEL = "llama-3.1-8b-instant"
+MAX_TOKENS = 500
+UPSTASH_BATCH_SIZE = int(os.getenv('UPSTASH_BATCH_SIZE', '100'))
+UPSTASH_POOL_THREADS = int(os.getenv('UPSTASH_POOL_THREADS', '8'))
+# Connections used more recently than this are still in the keep-alive pool
+# (httpx's default keep-alive expiry), so there is nothing to warm
+WARM_IDLE_SECONDS = float(os.getenv('WARM_IDLE_SECONDS', '5'))
+SYSTEM_PROMPT = """You are Diwan Malla's AI digital twin. You ARE Diwan - speak naturally in first person as yourself.
+
+IMPORTANT RULES:
+1. Respond conversationally like a real person would in an interview or casual chat
+2. NEVER say "This information is mentioned in my profile" or reference where data comes from
+3. NEVER list metadata, section names, or technical details about how you found the information
+4. Keep responses concise and natural - don't over-explain simple questions
+5. For yes/no questions, answer directly first, then add brief context if needed
+6. Show personality - be friendly, professional, and confident
+7. Use natural language, not robotic or formal phrasing
+
+EXAMPLES of good responses:
+- "Are you an international student?" → "Yes, I'm an international student currently based in Sydney. I'm available to start immediately and open to various work arrangements."
+- "What's your salary expectation?" → "I'm looking for around $95k-$115k for mid-level roles, though I'm flexible depending on the opportunity and growth potential."
+- "Do you know React?" → "Absolutely! React is actually my specialty - I've been working with it for over 4 years and have built several production apps with React 19 and Next.js 15."
+
+Be human, be natural, be Diwan."""
+
+# Prompt text around the retrieved context; static text first so the prompt
+# prefix stays the same across turns
+RAG_PROMPT_HEAD = """Here is relevant information about yourself:
 
-def create_chunks_from_json(data, prefix="", parent_key=""):
-    """Recursively create chunks from JSON data"""
+"""
+RAG_PROMPT_TAIL = """
+
+Question: {question}
+
+Answer naturally as yourself. Be direct and conversational:"""
+
+query_cache = SemanticCache()
+# Namespaced by the prompts, so the MCP server's answers in the same file aren't served here
+response_cache = ResponseCache(namespace=prompt_namespace(SYSTEM_PROMPT, RAG_PROMPT_HEAD, RAG_PROMPT_TAIL, MAX_TOKENS))
+
+@dataclass(slots=True)
+class Chunk:
+    """One piece of profile text to embed; type and category are interned since few values repeat"""
+    id: str
+    title: str
+    content: str
+    type: str
+    category: str
+    tags: tuple = ()
+    
+    @classmethod
+    def from_dict(cls, chunk):
+        """Build a Chunk from a pre-structured content_chunks entry"""
+        md = chunk.get('metadata') or {}
+        chunk_type = sys.intern(chunk.get('type') or 'general')
+        return cls(
+            id=chunk['id'],
+            title=chunk.get('title', ''),
+            content=chunk['content'],
+            type=chunk_type,
+            category=sys.intern(md.get('category', '')),
+            tags=tuple(md.get('tags', ()))
+        )
+
+def upload_vectors(index, vectors):
+    """Upload vectors in batches on a bounded thread pool; returns the failed ids"""
+    failed = []
+    with ThreadPoolExecutor(max_workers=UPSTASH_POOL_THREADS) as executor:
+        futures = [executor.submit(upsert_batch, index, batch) for batch in batched(vectors, UPSTASH_BATCH_SIZE)]
+        for future in as_completed(futures):
+            failed.extend(future.result())
+    return failed
+
+def create_chunks_from_json(data):
+    """Create chunks from JSON data, walking nested objects with an explicit stack"""
     chunks = []
+    # Each frame is (iterator, prefix, parent_key, is_list); dict frames
+    # iterate (key, value) pairs, list frames iterate (index, item) pairs
+    stack = [(iter(data.items()), "", "", False)]
     
-    for key, value in data.items():
+    while stack:
+        items, prefix, parent_key, is_list = stack[-1]
+        entry = next(items, None)
+        if entry is None:
+            stack.pop()
+            continue
+        
+        if is_list:
+            # List item: prefix is the list's id and parent_key its key
+            i, item = entry
+            key = parent_key
+            item_id = f"{prefix}[{i}]"
+            if isinstance(item, dict):
+                # Create a chunk for the dict item, then descend into it
+                item_content = orjson.dumps(item).decode()
+                title = f"{key} - {item.get('name', item.get('title', f'Item {i+1}'))}"
+                chunks.append(Chunk(id=item_id, title=title, content=item_content, type=key, category=key))
+                stack.append((iter(item.items()), item_id, key, False))
+            else:
+                # Simple list item
+                chunks.append(Chunk(id=item_id, title=f"{key} {i+1}", content=str(item), type=key, category=key))
+            continue
+        
+        key, value = entry
         current_prefix = f"{prefix}{key}" if not prefix else f"{prefix}.{key}"
         
         if isinstance(value, dict):
-            # For nested objects, create a chunk for the object and recurse
+            # For nested objects, create a chunk for the object and descend
             if parent_key:
-                chunk_content = json.dumps(value, indent=2)
-                chunks.append({
-                    "id": current_prefix,
-                    "title": f"{parent_key} - {key}",
-                    "content": chunk_content,
-                    "type": parent_key,
-                    "metadata": {"category": parent_key, "subcategory": key}
-                })
-            chunks.extend(create_chunks_from_json(value, current_prefix, key))
+                chunk_content = orjson.dumps(value).decode()
+                chunks.append(Chunk(
+                    id=current_prefix,
+                    title=f"{parent_key} - {key}",
+                    content=chunk_content,
+                    type=parent_key,
+                    category=parent_key
+                ))
+            stack.append((iter(value.items()), current_prefix, sys.intern(key), False))
         elif isinstance(value, list):
             # For lists, create chunks for each item
-            for i, item in enumerate(value):
-                item_id = f"{current_prefix}[{i}]"
-                if isinstance(item, dict):
-                    # Create a chunk for the dict item
-                    item_content = json.dumps(item, indent=2)
-                    title = f"{key} - {item.get('name', item.get('title', f'Item {i+1}'))}"
-                    chunks.append({
-                        "id": item_id,
-                        "title": title,
-                        "content": item_content,
-                        "type": key,
-                        "metadata": {"category": key, "index": i}
-                    })
-                    # Recurse into the item
-                    chunks.extend(create_chunks_from_json(item, item_id, key))
-                else:
-                    # Simple list item
-                    chunks.append({
-                        "id": item_id,
-                        "title": f"{key} {i+1}",
-                        "content": str(item),
-                        "type": key,
-                        "metadata": {"category": key, "index": i}
-                    })
+            stack.append((enumerate(value), current_prefix, sys.intern(key), True))
         else:
             # Simple value
-            chunks.append({
-                "id": current_prefix,
-                "title": key.replace('_', ' ').title(),
-                "content": str(value),
-                "type": parent_key or "general",
-                "metadata": {"category": parent_key or "general"}
-            })
+            chunk_type = parent_key or "general"
+            chunks.append(Chunk(
+                id=current_prefix,
+                title=key.replace('_', ' ').title(),
+                content=str(value),
+                type=chunk_type,
+                category=chunk_type
+            ))
     
     return chunks
 
+def group_by_type(chunks):
+    """Group pre-structured chunks by type for the MCP server's static tools"""
+    by_type = defaultdict(list)
+    for chunk in chunks:
+        by_type[chunk.type].append({
+            "id": chunk.id,
+            "title": chunk.title,
+            "content": chunk.content,
+            "category": chunk.category
+        })
+    return dict(by_type)
+
 def setup_groq_client():
     """Setup Groq client"""
     if not GROQ_API_KEY:
@@ -83,7 +190,7 @@ def setup_groq_client():
         return None
     
     try:
-        client = Groq(api_key=GROQ_API_KEY)
+        client = create_groq_client(GROQ_API_KEY)
         print("✅ Groq client initialized successfully!")
         return client
     except Exception as e:
@@ -91,12 +198,36 @@ def setup_groq_client():
         return None
 
 def setup_vector_database():
-    """Setup Upstash Vector database with built-in embeddings"""
-    print("🔄 Setting up Upstash Vector database...")
+    """Setup Upstash Vector database with built-in embeddings, or the local index"""
+    if VECTOR_BACKEND == "local":
+        print("🔄 Setting up local vector index...")
+    else:
+        print("🔄 Setting up Upstash Vector database...")
     
     try:
-        index = Index.from_env()
-        print("✅ Connected to Upstash Vector successfully!")
+        try:
+            with open(JSON_FILE, "rb") as f:
+                raw_profile = f.read()
+        except FileNotFoundError:
+            print(f"❌ {JSON_FILE} not found!")
+            return None
+        
+        # The backend, target index and chunk format are part of the hash, so
+        # switching any of them re-ingests
+        target = LOCAL_INDEX_PATH if VECTOR_BACKEND == "local" else os.getenv("UPSTASH_VECTOR_REST_URL", "")
+        ingest_key = f"{VECTOR_BACKEND}\0{target}\0{CHUNK_FORMAT_VERSION}\0".encode()
+        ingest_hash = hashlib.blake2b(ingest_key + raw_profile).hexdigest()
+        unchanged = ingest_hash == read_ingest_hash() and os.path.exists(BY_TYPE_FILE)
+        
+        if VECTOR_BACKEND == "local":
+            if unchanged and os.path.exists(f"{LOCAL_INDEX_PATH}.json"):
+                index = LocalIndex.load(LOCAL_INDEX_PATH)
+            else:
+                index = LocalIndex()
+            print("✅ Using local embeddings and in-process vector index!")
+        else:
+            index = create_vector_index()
+            print("✅ Connected to Upstash Vector successfully!")
         
         # Check current vector count
         try:
@@ -106,16 +237,13 @@ def setup_vector_database():
         except:
             current_count = 0
         
-        # Load data (always load to ensure all data is uploaded)
-        if current_count == 0 or True:  # Force load for now
+        # Load data unless this exact profile is already uploaded
+        if unchanged and current_count > 0:
+            print("✅ Profile unchanged since last upload, skipping ingest")
+        else:
             print("📝 Loading your complete professional profile...")
             
-            try:
-                with open(JSON_FILE, "r", encoding="utf-8") as f:
-                    profile_data = json.load(f)
-            except FileNotFoundError:
-                print(f"❌ {JSON_FILE} not found!")
-                return None
+            profile_data = orjson.loads(raw_profile)
             
             # Prepare vectors from all profile data
             # Remove content_chunks to avoid duplication since they are pre-structured
@@ -125,7 +253,7 @@ def setup_vector_database():
             all_chunks = create_chunks_from_json(profile_data_copy)
             
             # Add back the pre-structured content_chunks
-            content_chunks = profile_data.get('content_chunks', [])
+            content_chunks = [Chunk.from_dict(chunk) for chunk in profile_data.get('content_chunks', [])]
             all_chunks.extend(content_chunks)
             
             print(f"📊 Generated {len(all_chunks)} total chunks ({len(all_chunks) - len(content_chunks)} from JSON + {len(content_chunks)} content_chunks)")
@@ -133,22 +261,34 @@ def setup_vector_database():
             vectors = []
             
             for chunk in all_chunks:
-                enriched_text = f"{chunk['title']}: {chunk['content']}"
+                # The content travels once, as the embedded data; readers
+                # recover it from there (see result_content)
+                enriched_text = f"{chunk.title}: {chunk.content}"
                 
                 vectors.append((
-                    chunk['id'],
+                    chunk.id,
                     enriched_text,
                     {
-                        "title": chunk['title'],
-                        "type": chunk['type'],
-                        "content": chunk['content'],
-                        "category": chunk.get('metadata', {}).get('category', ''),
-                        "tags": chunk.get('metadata', {}).get('tags', [])
+                        "title": chunk.title,
+                        "type": chunk.type,
+                        "category": chunk.category,
+                        "tags": list(chunk.tags)
                     }
                 ))
             
-            # Upload vectors
-            index.upsert(vectors=vectors)
+            if VECTOR_BACKEND == "local":
+                # Embed everything locally and persist for the MCP server
+                index.upsert(vectors)
+                index.save(LOCAL_INDEX_PATH)
+            else:
+                # Upload vectors in batches, several requests in flight at once
+                failed = upload_vectors(index, vectors)
+                if failed:
+                    # Leave the ingest hash alone so the next start retries
+                    print(f"⚠️ Uploaded {len(vectors) - len(failed)}/{len(vectors)} profile data chunks")
+                    return index
+            write_ingest_hash(ingest_hash)
+            save_chunks_by_type(group_by_type(content_chunks), ingest_hash)
             print(f"✅ Successfully uploaded {len(vectors)} profile data chunks!")
         
         return index
@@ -158,43 +298,40 @@ def setup_vector_database():
         return None
 
 def query_vectors(index, query_text, top_k=3):
-    """Query Upstash Vector for similar vectors"""
+    """Query Upstash Vector for similar vectors, reusing results for similar questions"""
     try:
-        results = index.query(
-            data=query_text,
-            top_k=top_k,
-            include_metadata=True
+        results = query_cache.get_or_compute(
+            query_text,
+            lambda: index.query(
+                data=query_text,
+                top_k=top_k,
+                include_metadata=True,
+                include_data=True
+            ),
+            namespace=top_k
         )
         return results
     except Exception as e:
         print(f"❌ Error querying vectors: {str(e)}")
         return None
 
-def generate_response_with_groq(client, prompt, model=DEFAULT_MODEL):
-    """Generate response using Groq"""
+def generate_response_with_groq(client, prompt, model=DEFAULT_MODEL, cache_key=None, context_ids=(), on_token=None):
+    """Generate response using Groq, streaming tokens to on_token as they arrive
+    
+    Reuses the answer to a similar cache_key over the same context_ids if given (nothing is streamed then)
+    """
     try:
+        if cache_key:
+            cached = response_cache.get(cache_key, model, context_ids)
+            if cached:
+                return cached
+        
         completion = client.chat.completions.create(
             model=model,
             messages=[
                 {
                     "role": "system",
-                    "content": """You are Diwan Malla's AI digital twin. You ARE Diwan - speak naturally in first person as yourself.
-
-IMPORTANT RULES:
-1. Respond conversationally like a real person would in an interview or casual chat
-2. NEVER say "This information is mentioned in my profile" or reference where data comes from
-3. NEVER list metadata, section names, or technical details about how you found the information
-4. Keep responses concise and natural - don't over-explain simple questions
-5. For yes/no questions, answer directly first, then add brief context if needed
-6. Show personality - be friendly, professional, and confident
-7. Use natural language, not robotic or formal phrasing
-
-EXAMPLES of good responses:
-- "Are you an international student?" → "Yes, I'm an international student currently based in Sydney. I'm available to start immediately and open to various work arrangements."
-- "What's your salary expectation?" → "I'm looking for around $95k-$115k for mid-level roles, though I'm flexible depending on the opportunity and growth potential."
-- "Do you know React?" → "Absolutely! React is actually my specialty - I've been working with it for over 4 years and have built several production apps with React 19 and Next.js 15."
-
-Be human, be natural, be Diwan."""
+                    "content": SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
@@ -202,16 +339,28 @@ Be human, be natural, be Diwan."""
                 }
             ],
             temperature=0.7,
-            max_tokens=500
+            max_tokens=MAX_TOKENS,
+            stream=True
         )
         
-        return completion.choices[0].message.content.strip()
+        parts = []
+        for chunk in completion:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token:
+                parts.append(token)
+                if on_token:
+                    on_token(token)
+        
+        response = "".join(parts).strip()
+        if cache_key:
+            response_cache.put(cache_key, model, response, context_ids)
+        return response
         
     except Exception as e:
         return f"❌ Error generating response: {str(e)}"
 
-def rag_query(index, groq_client, question):
-    """Perform RAG query using Upstash Vector + Groq"""
+def rag_query(index, groq_client, question, no_cache=False, on_token=None):
+    """Perform RAG query using Upstash Vector + Groq, streaming the answer to on_token"""
     try:
         # Step 1: Query vector database
         results = query_vectors(index, question, top_k=3)
@@ -220,45 +369,53 @@ def rag_query(index, groq_client, question):
             return "I don't have specific information about that topic."
         
         # Step 2: Extract relevant content
-        print("\n🧠 Searching your professional profile...\n")
+        found = [((r.metadata or {}).get('title', 'Information'), result_content(r), r.score) for r in results]
+        print("\n🧠 Searching your professional profile...\n\n" + "\n".join(
+            f"🔹 Found: {title} (Relevance: {score:.3f})" for title, _, score in found
+        ))
         
-        top_docs = []
-        for result in results:
-            metadata = result.metadata or {}
-            title = metadata.get('title', 'Information')
-            content = metadata.get('content', '')
-            score = result.score
-            
-            print(f"🔹 Found: {title} (Relevance: {score:.3f})")
-            if content:
-                top_docs.append(f"{title}: {content}")
+        top_docs = [f"{title}: {content}" for title, content, _ in found if content]
         
         if not top_docs:
             return "I found some information but couldn't extract details."
         
         print(f"⚡ Generating personalized response...\n")
         
-        # Step 3: Generate response with context
-        context = "\n\n".join(top_docs)
-        prompt = f"""Here is relevant information about yourself:
-
-{context}
-
-Question: {question}
-
-Answer naturally as yourself. Be direct and conversational:"""
+        # Step 3: Generate response with context, joined in one pass
+        parts = [RAG_PROMPT_HEAD]
+        for doc in top_docs:
+            parts += (doc, "\n\n")
+        parts[-1] = RAG_PROMPT_TAIL.format(question=question)
+        prompt = "".join(parts)
         
-        response = generate_response_with_groq(groq_client, prompt)
+        response = generate_response_with_groq(
+            groq_client,
+            prompt,
+            cache_key=None if no_cache else question,
+            context_ids=[r.id for r in results],
+            on_token=on_token
+        )
         return response
     
     except Exception as e:
         return f"❌ Error during query: {str(e)}"
 
-def main():
+def warm_connections(index, groq_client):
+    """Touch both services so their pooled keep-alive connections are open for the next question"""
+    for warm in (index.info, groq_client.models.list):
+        try:
+            warm()
+        except Exception:
+            pass
+
+async def main():
     """Main application loop"""
     print("🤖 Your Digital Twin - AI Profile Assistant")
     print("=" * 50)
-    print("🔗 Vector Storage: Upstash (built-in embeddings)")
+    if VECTOR_BACKEND == "local":
+        print("🔗 Vector Storage: Local index (in-process embeddings)")
+    else:
+        print("🔗 Vector Storage: Upstash (built-in embeddings)")
     print(f"⚡ AI Inference: Groq ({DEFAULT_MODEL})")
     print("📋 Data Source: Your Professional Profile\n")
     
@@ -284,15 +441,44 @@ def main():
     print("  - 'Describe your career goals'")
     print()
     
+    session = PromptSession()
+    last_request = time.monotonic()
+    warmup = None
+    
     while True:
-        question = input("You: ")
+        # Re-open idle connections while the user is still typing. The warmup runs
+        # on a daemon thread that is never waited on, so a slow service can't
+        # delay the answer or the exit
+        idle = time.monotonic() - last_request > WARM_IDLE_SECONDS
+        if idle and (warmup is None or not warmup.is_alive()):
+            warmup = threading.Thread(target=warm_connections, args=(index, groq_client), daemon=True)
+            warmup.start()
+        try:
+            question = await session.prompt_async("You: ")
+        except (EOFError, KeyboardInterrupt):
+            question = "exit"
+        
         if question.lower() in ["exit", "quit"]:
             print("👋 Thanks for chatting with your Digital Twin!")
             break
         
         if question.strip():
-            answer = rag_query(index, groq_client, question)
-            print(f"🤖 Digital Twin: {answer}\n")
+            streamed = []
+            
+            def echo(token):
+                # Print tokens as they arrive instead of waiting for the full answer
+                if not streamed:
+                    token = token.lstrip()
+                    print("🤖 Digital Twin: ", end="", flush=True)
+                streamed.append(token)
+                print(token, end="", flush=True)
+            
+            answer = await asyncio.to_thread(rag_query, index, groq_client, question, on_token=echo)
+            last_request = time.monotonic()
+            if streamed:
+                print("\n")
+            if not streamed or answer.startswith("❌"):
+                print(f"🤖 Digital Twin: {answer}\n")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
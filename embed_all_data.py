@@ -6,329 +6,332 @@ Including personal info, experience, projects, skills, education, etc.
 """
 
 import os
-import json
+import sys
+import asyncio
+import hashlib
+from dataclasses import dataclass
+import orjson
 from dotenv import load_dotenv
-from upstash_vector import Index
-import time
 
 # Load environment variables
 load_dotenv('.env.local')
 
-def flatten_dict(d, parent_key='', sep='_'):
-    """Flatten nested dictionary into single level"""
-    items = []
-    for k, v in d.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            items.extend(flatten_dict(v, new_key, sep=sep).items())
-        elif isinstance(v, list):
-            for i, item in enumerate(v):
-                if isinstance(item, dict):
-                    items.extend(flatten_dict(item, f"{new_key}[{i}]", sep=sep).items())
-                else:
-                    items.append((f"{new_key}[{i}]", str(item)))
-        else:
-            items.append((new_key, v))
-    return dict(items)
+# Upload helpers are shared with embed_digitaltwin.py and the CLI; their batch
+# settings read the environment, so import them once .env.local is loaded
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-def create_comprehensive_chunks(data):
-    """Create embeddings from all sections of the digital twin data"""
-    chunks = []
-    chunk_id = 0
+from ingest_state import clear_ingest_hash
+from vector_upload import create_upload_index, upload_chunks
+
+# Upstash credentials are read once; fail fast before any data is parsed
+UPSTASH_URL = os.getenv('UPSTASH_VECTOR_REST_URL')
+UPSTASH_TOKEN = os.getenv('UPSTASH_VECTOR_REST_TOKEN')
+if not UPSTASH_URL or not UPSTASH_TOKEN:
+    raise ValueError("UPSTASH_VECTOR_REST_URL and UPSTASH_VECTOR_REST_TOKEN must be set")
+
+@dataclass(slots=True)
+class Chunk:
+    """One embedding chunk; converted to Upstash's vector dict only when uploaded"""
+    id: str
+    data: str
+    title: str
+    type: str
+    content: str
+    category: str
+    tags: list
     
-    # 1. Personal Information
-    if 'personal' in data:
-        personal = data['personal']
-        chunks.append({
-            'id': f'personal-info',
-            'data': f"Name: {personal.get('name', '')}. Title: {personal.get('title', '')}. Location: {personal.get('location', '')}. Summary: {personal.get('summary', '')}. Elevator Pitch: {personal.get('elevator_pitch', '')}",
+    def to_upsert_dict(self):
+        """Shape expected by Index.upsert"""
+        return {
+            'id': self.id,
+            'data': self.data,
             'metadata': {
-                'title': f"Personal Information - {personal.get('name', 'Profile')}",
-                'type': 'personal',
-                'content': f"My name is {personal.get('name', '')}. I am a {personal.get('title', '')} based in {personal.get('location', '')}. {personal.get('summary', '')}",
-                'category': 'identity',
-                'tags': ['personal', 'identity', 'name', personal.get('name', '').lower()]
+                'title': self.title,
+                'type': self.type,
+                'content': self.content,
+                'category': self.category,
+                'tags': self.tags
             }
-        })
+        }
+
+def joinlist(d, key, sep=', '):
+    """Join the list at d[key], or '' if it is missing or empty"""
+    values = d.get(key)
+    return sep.join(values) if values else ''
+
+def load_json(file_path):
+    """Parse the whole JSON file in one pass"""
+    with open(file_path, 'rb') as f:
+        return orjson.loads(f.read())
+
+def create_comprehensive_chunks(file_path='digitaltwin.json'):
+    """Yield embedding chunks from all sections of the digital twin data, one section at a time"""
+    data = load_json(file_path)
+    
+    # 1. Personal Information
+    personal = data.get('personal')
+    if personal is not None:
+        name = personal.get('name', '')
+        title = personal.get('title', '')
+        location = personal.get('location', '')
+        summary = personal.get('summary', '')
+        yield Chunk(
+            id='personal-info',
+            data=f"Name: {name}. Title: {title}. Location: {location}. Summary: {summary}. Elevator Pitch: {personal.get('elevator_pitch', '')}",
+            title=f"Personal Information - {personal.get('name', 'Profile')}",
+            type='personal',
+            content=f"My name is {name}. I am a {title} based in {location}. {summary}",
+            category='identity',
+            tags=['personal', 'identity', 'name', name.lower()]
+        )
         
         # Contact info
         if 'contact' in personal:
             contact = personal['contact']
             contact_text = f"Email: {contact.get('email', '')}. Phone: {contact.get('phone', '')}. LinkedIn: {contact.get('linkedin', '')}. GitHub: {contact.get('github', '')}. Portfolio: {contact.get('portfolio', '')}"
-            chunks.append({
-                'id': 'contact-info',
-                'data': contact_text,
-                'metadata': {
-                    'title': 'Contact Information',
-                    'type': 'contact',
-                    'content': contact_text,
-                    'category': 'contact',
-                    'tags': ['contact', 'email', 'phone', 'linkedin', 'github']
-                }
-            })
+            yield Chunk(
+                id='contact-info',
+                data=contact_text,
+                title='Contact Information',
+                type='contact',
+                content=contact_text,
+                category='contact',
+                tags=['contact', 'email', 'phone', 'linkedin', 'github']
+            )
     
     # 2. Salary and Location
-    if 'salary_location' in data:
-        sal_loc = data['salary_location']
-        sal_text = f"Current Salary: {sal_loc.get('current_salary', '')}. Mid-Level Expectations: {sal_loc.get('salary_expectations', {}).get('mid_level_roles', '')}. Senior Expectations: {sal_loc.get('salary_expectations', {}).get('senior_roles', '')}. Locations: {', '.join(sal_loc.get('location_preferences', []))}. Relocation: {sal_loc.get('relocation_willing', '')}. Remote Experience: {sal_loc.get('remote_experience', '')}. Work Authorization: {sal_loc.get('work_authorization', '')}."
-        chunks.append({
-            'id': 'salary-location',
-            'data': sal_text,
-            'metadata': {
-                'title': 'Salary and Location Preferences',
-                'type': 'compensation',
-                'content': sal_text,
-                'category': 'compensation',
-                'tags': ['salary', 'location', 'remote', 'relocation']
-            }
-        })
+    sal_loc = data.get('salary_location')
+    if sal_loc is not None:
+        expectations = sal_loc.get('salary_expectations', {})
+        sal_text = f"Current Salary: {sal_loc.get('current_salary', '')}. Mid-Level Expectations: {expectations.get('mid_level_roles', '')}. Senior Expectations: {expectations.get('senior_roles', '')}. Locations: {joinlist(sal_loc, 'location_preferences')}. Relocation: {sal_loc.get('relocation_willing', '')}. Remote Experience: {sal_loc.get('remote_experience', '')}. Work Authorization: {sal_loc.get('work_authorization', '')}."
+        yield Chunk(
+            id='salary-location',
+            data=sal_text,
+            title='Salary and Location Preferences',
+            type='compensation',
+            content=sal_text,
+            category='compensation',
+            tags=['salary', 'location', 'remote', 'relocation']
+        )
     
     # 3. Experience (Each job)
-    if 'experience' in data:
-        for idx, exp in enumerate(data['experience']):
-            exp_text = f"Company: {exp.get('company', '')}. Title: {exp.get('title', '')}. Duration: {exp.get('duration', '')}. Context: {exp.get('company_context', '')}. "
-            
-            # Add achievements
-            if 'achievements_star' in exp:
-                for ach_idx, ach in enumerate(exp['achievements_star']):
-                    exp_text += f"Achievement {ach_idx + 1} - Situation: {ach.get('situation', '')}. Task: {ach.get('task', '')}. Action: {ach.get('action', '')}. Result: {ach.get('result', '')}. "
-            
-            # Add skills
-            if 'technical_skills_used' in exp:
-                exp_text += f"Skills: {', '.join(exp['technical_skills_used'])}."
-            
-            chunks.append({
-                'id': f'experience-{idx}',
-                'data': exp_text,
-                'metadata': {
-                    'title': f"{exp.get('title', '')} at {exp.get('company', '')}",
-                    'type': 'experience',
-                    'content': exp_text,
-                    'category': 'work_experience',
-                    'tags': ['experience', exp.get('company', '').lower(), exp.get('title', '').lower()]
-                }
-            })
+    for idx, exp in enumerate(data.get('experience', [])):
+        company = exp.get('company', '')
+        title = exp.get('title', '')
+        parts = [f"Company: {company}. Title: {title}. Duration: {exp.get('duration', '')}. Context: {exp.get('company_context', '')}. "]
+        
+        # Add achievements
+        for ach_idx, ach in enumerate(exp.get('achievements_star', [])):
+            parts.append(f"Achievement {ach_idx + 1} - Situation: {ach.get('situation', '')}. Task: {ach.get('task', '')}. Action: {ach.get('action', '')}. Result: {ach.get('result', '')}. ")
+        
+        # Add skills
+        if 'technical_skills_used' in exp:
+            parts.append(f"Skills: {', '.join(exp['technical_skills_used'])}.")
+        
+        exp_text = ''.join(parts)
+        
+        yield Chunk(
+            id=f'experience-{idx}',
+            data=exp_text,
+            title=f"{title} at {company}",
+            type='experience',
+            content=exp_text,
+            category='work_experience',
+            tags=['experience', company.lower(), title.lower()]
+        )
     
     # 4. Projects Portfolio
-    if 'projects_portfolio' in data:
-        for idx, proj in enumerate(data['projects_portfolio']):
-            proj_text = f"Project: {proj.get('name', '')}. Duration: {proj.get('duration', '')}. Description: {proj.get('description', '')}. Technologies: {', '.join(proj.get('technologies', []))}. Impact: {proj.get('impact', '')}."
-            chunks.append({
-                'id': f'project-{idx}',
-                'data': proj_text,
-                'metadata': {
-                    'title': proj.get('name', 'Project'),
-                    'type': 'project',
-                    'content': proj_text,
-                    'category': 'projects',
-                    'tags': ['project'] + proj.get('technologies', [])
-                }
-            })
+    for idx, proj in enumerate(data.get('projects_portfolio', [])):
+        technologies = proj.get('technologies') or ()
+        proj_text = f"Project: {proj.get('name', '')}. Duration: {proj.get('duration', '')}. Description: {proj.get('description', '')}. Technologies: {', '.join(technologies)}. Impact: {proj.get('impact', '')}."
+        yield Chunk(
+            id=f'project-{idx}',
+            data=proj_text,
+            title=proj.get('name', 'Project'),
+            type='project',
+            content=proj_text,
+            category='projects',
+            tags=['project', *technologies]
+        )
     
     # 5. Skills - Frontend
-    if 'skills' in data and 'frontend' in data['skills']:
-        frontend = data['skills']['frontend']
-        fe_text = f"Primary Frontend Expertise: {', '.join(frontend.get('primary_expertise', []))}. UI Frameworks: {', '.join(frontend.get('ui_frameworks', []))}. State Management: {', '.join(frontend.get('state_management', []))}."
-        chunks.append({
-            'id': 'skills-frontend',
-            'data': fe_text,
-            'metadata': {
-                'title': 'Frontend Skills',
-                'type': 'skills',
-                'content': fe_text,
-                'category': 'technical_skills',
-                'tags': ['frontend', 'react', 'nextjs', 'typescript']
-            }
-        })
+    skills = data.get('skills') or {}
+    if 'frontend' in skills:
+        frontend = skills['frontend']
+        fe_text = f"Primary Frontend Expertise: {joinlist(frontend, 'primary_expertise')}. UI Frameworks: {joinlist(frontend, 'ui_frameworks')}. State Management: {joinlist(frontend, 'state_management')}."
+        yield Chunk(
+            id='skills-frontend',
+            data=fe_text,
+            title='Frontend Skills',
+            type='skills',
+            content=fe_text,
+            category='technical_skills',
+            tags=['frontend', 'react', 'nextjs', 'typescript']
+        )
     
     # 6. Skills - Backend
-    if 'skills' in data and 'backend' in data['skills']:
-        backend = data['skills']['backend']
-        be_text = f"Backend Skills: {', '.join(backend.get('primary', []))}. APIs: {', '.join(backend.get('apis', []))}."
-        chunks.append({
-            'id': 'skills-backend',
-            'data': be_text,
-            'metadata': {
-                'title': 'Backend Skills',
-                'type': 'skills',
-                'content': be_text,
-                'category': 'technical_skills',
-                'tags': ['backend', 'nodejs', 'python', 'api']
-            }
-        })
+    if 'backend' in skills:
+        backend = skills['backend']
+        be_text = f"Backend Skills: {joinlist(backend, 'primary')}. APIs: {joinlist(backend, 'apis')}."
+        yield Chunk(
+            id='skills-backend',
+            data=be_text,
+            title='Backend Skills',
+            type='skills',
+            content=be_text,
+            category='technical_skills',
+            tags=['backend', 'nodejs', 'python', 'api']
+        )
     
     # 7. Skills - Databases
-    if 'skills' in data and 'databases' in data['skills']:
-        db = data['skills']['databases']
-        db_text = f"Database Experience: {', '.join(db.get('production_experience', []))}. Familiar With: {', '.join(db.get('familiar_with', []))}. ORM Tools: {', '.join(db.get('orm_tools', []))}."
-        chunks.append({
-            'id': 'skills-databases',
-            'data': db_text,
-            'metadata': {
-                'title': 'Database Skills',
-                'type': 'skills',
-                'content': db_text,
-                'category': 'technical_skills',
-                'tags': ['database', 'postgresql', 'mongodb', 'sql']
-            }
-        })
+    if 'databases' in skills:
+        db = skills['databases']
+        db_text = f"Database Experience: {joinlist(db, 'production_experience')}. Familiar With: {joinlist(db, 'familiar_with')}. ORM Tools: {joinlist(db, 'orm_tools')}."
+        yield Chunk(
+            id='skills-databases',
+            data=db_text,
+            title='Database Skills',
+            type='skills',
+            content=db_text,
+            category='technical_skills',
+            tags=['database', 'postgresql', 'mongodb', 'sql']
+        )
     
     # 8. Skills - Cloud/DevOps
-    if 'skills' in data and 'cloud_devops' in data['skills']:
-        cloud = data['skills']['cloud_devops']
-        cloud_text = f"AWS Services: {', '.join(cloud.get('aws', []))}. Platforms: {', '.join(cloud.get('platforms', []))}. CI/CD: {', '.join(cloud.get('cicd', []))}."
-        chunks.append({
-            'id': 'skills-cloud-devops',
-            'data': cloud_text,
-            'metadata': {
-                'title': 'Cloud and DevOps Skills',
-                'type': 'skills',
-                'content': cloud_text,
-                'category': 'technical_skills',
-                'tags': ['cloud', 'aws', 'devops', 'cicd']
-            }
-        })
+    if 'cloud_devops' in skills:
+        cloud = skills['cloud_devops']
+        cloud_text = f"AWS Services: {joinlist(cloud, 'aws')}. Platforms: {joinlist(cloud, 'platforms')}. CI/CD: {joinlist(cloud, 'cicd')}."
+        yield Chunk(
+            id='skills-cloud-devops',
+            data=cloud_text,
+            title='Cloud and DevOps Skills',
+            type='skills',
+            content=cloud_text,
+            category='technical_skills',
+            tags=['cloud', 'aws', 'devops', 'cicd']
+        )
     
     # 9. Soft Skills
-    if 'skills' in data and 'soft_skills' in data['skills']:
-        soft = data['skills']['soft_skills']
+    if 'soft_skills' in skills:
+        soft = skills['soft_skills']
         soft_text = f"Soft Skills: {', '.join(soft) if isinstance(soft, list) else soft}"
-        chunks.append({
-            'id': 'skills-soft',
-            'data': soft_text,
-            'metadata': {
-                'title': 'Soft Skills',
-                'type': 'skills',
-                'content': soft_text,
-                'category': 'soft_skills',
-                'tags': ['soft skills', 'agile', 'collaboration', 'leadership']
-            }
-        })
+        yield Chunk(
+            id='skills-soft',
+            data=soft_text,
+            title='Soft Skills',
+            type='skills',
+            content=soft_text,
+            category='soft_skills',
+            tags=['soft skills', 'agile', 'collaboration', 'leadership']
+        )
     
     # 10. Education
-    if 'education' in data:
-        edu = data['education']
+    edu = data.get('education')
+    if edu is not None:
         edu_text = f"Degree: {edu.get('degree', '')}. University: {edu.get('university', '')}. Graduation: {edu.get('graduation_year', '')}. Location: {edu.get('location', '')}."
-        chunks.append({
-            'id': 'education',
-            'data': edu_text,
-            'metadata': {
-                'title': 'Education',
-                'type': 'education',
-                'content': edu_text,
-                'category': 'education',
-                'tags': ['education', 'university', 'degree']
-            }
-        })
+        yield Chunk(
+            id='education',
+            data=edu_text,
+            title='Education',
+            type='education',
+            content=edu_text,
+            category='education',
+            tags=['education', 'university', 'degree']
+        )
     
     # 11. Career Goals
-    if 'career_goals' in data:
-        goals = data['career_goals']
-        goals_text = f"Current Level: {goals.get('current_level', '')}. Target: {goals.get('target_seniority', '')}. Short Term: {goals.get('short_term', '')}. Long Term: {goals.get('long_term', '')}. Learning Focus: {', '.join(goals.get('learning_focus', []))}."
-        chunks.append({
-            'id': 'career-goals',
-            'data': goals_text,
-            'metadata': {
-                'title': 'Career Goals',
-                'type': 'career',
-                'content': goals_text,
-                'category': 'career_goals',
-                'tags': ['career', 'goals', 'learning']
-            }
-        })
+    goals = data.get('career_goals')
+    if goals is not None:
+        goals_text = f"Current Level: {goals.get('current_level', '')}. Target: {goals.get('target_seniority', '')}. Short Term: {goals.get('short_term', '')}. Long Term: {goals.get('long_term', '')}. Learning Focus: {joinlist(goals, 'learning_focus')}."
+        yield Chunk(
+            id='career-goals',
+            data=goals_text,
+            title='Career Goals',
+            type='career',
+            content=goals_text,
+            category='career_goals',
+            tags=['career', 'goals', 'learning']
+        )
     
-    # 12. Professional Development
-    if 'professional_development' in data:
-        prof_dev = data['professional_development']
-        
-        # Certifications
-        if 'certifications' in prof_dev:
-            for cert in prof_dev['certifications']:
-                cert_text = f"Certification: {cert.get('name', '')}. Issuer: {cert.get('issuer', '')}. Year: {cert.get('year', '')}. Skills: {', '.join(cert.get('skills', []))}."
-                chunks.append({
-                    'id': f"cert-{cert.get('name', '').lower().replace(' ', '-')}",
-                    'data': cert_text,
-                    'metadata': {
-                        'title': f"Certification: {cert.get('name', '')}",
-                        'type': 'certification',
-                        'content': cert_text,
-                        'category': 'professional_development',
-                        'tags': ['certification', cert.get('issuer', '').lower()]
-                    }
-                })
+    # 12. Professional Development - Certifications
+    for cert in data.get('professional_development', {}).get('certifications', []):
+        name = cert.get('name', '')
+        issuer = cert.get('issuer', '')
+        cert_text = f"Certification: {name}. Issuer: {issuer}. Year: {cert.get('year', '')}. Skills: {joinlist(cert, 'skills')}."
+        yield Chunk(
+            id=f"cert-{name.lower().replace(' ', '-')}",
+            data=cert_text,
+            title=f"Certification: {name}",
+            type='certification',
+            content=cert_text,
+            category='professional_development',
+            tags=['certification', issuer.lower()]
+        )
     
     # 13. Technology Adaptation
-    if 'technology_adaptation' in data:
-        tech_adapt = data['technology_adaptation']
+    tech_adapt = data.get('technology_adaptation')
+    if tech_adapt is not None:
         if 'learning_track_record' in tech_adapt and 'fast_adoptions' in tech_adapt['learning_track_record']:
             adapt_text = f"Fast Technology Adoptions: {', '.join(tech_adapt['learning_track_record']['fast_adoptions'])}. Willingness: {tech_adapt.get('willingness_statement', '')}."
-            chunks.append({
-                'id': 'tech-adaptation',
-                'data': adapt_text,
-                'metadata': {
-                    'title': 'Technology Adaptation',
-                    'type': 'learning',
-                    'content': adapt_text,
-                    'category': 'learning_agility',
-                    'tags': ['learning', 'adaptation', 'fast learner']
-                }
-            })
+            yield Chunk(
+                id='tech-adaptation',
+                data=adapt_text,
+                title='Technology Adaptation',
+                type='learning',
+                content=adapt_text,
+                category='learning_agility',
+                tags=['learning', 'adaptation', 'fast learner']
+            )
     
     # 14. Also include the pre-made content_chunks if they exist
-    if 'content_chunks' in data:
-        for chunk in data['content_chunks']:
-            chunks.append({
-                'id': chunk['id'],
-                'data': chunk['content'],
-                'metadata': {
-                    'title': chunk.get('title', ''),
-                    'type': chunk.get('type', ''),
-                    'content': chunk['content'],
-                    'category': chunk.get('metadata', {}).get('category', ''),
-                    'tags': chunk.get('metadata', {}).get('tags', [])
-                }
-            })
-    
-    return chunks
+    for chunk in data.get('content_chunks', []):
+        yield Chunk(
+            id=chunk['id'],
+            data=chunk['content'],
+            title=chunk.get('title', ''),
+            type=chunk.get('type', ''),
+            content=chunk['content'],
+            category=chunk.get('metadata', {}).get('category', ''),
+            tags=chunk.get('metadata', {}).get('tags', [])
+        )
+
+def dedupe_chunks(chunks):
+    """Drop chunks whose id or text (whitespace-collapsed) was already seen, so each is only embedded once"""
+    # Synthesized sections come first, so a pre-made content_chunk repeating one
+    # is skipped rather than re-embedded (or, with the same id, overwriting it)
+    seen_ids = set()
+    seen_hashes = set()
+    for chunk in chunks:
+        if chunk.id in seen_ids:
+            print(f"  - Skipping duplicate id: {chunk.id}")
+            continue
+        digest = hashlib.blake2b(' '.join(chunk.data.split()).encode('utf-8'), digest_size=16).digest()
+        if digest in seen_hashes:
+            print(f"  - Skipping duplicate: {chunk.id}")
+            continue
+        seen_ids.add(chunk.id)
+        seen_hashes.add(digest)
+        yield chunk
 
-def embed_to_upstash(chunks):
+async def embed_to_upstash(chunks):
     """Embed all chunks into Upstash Vector database"""
     
-    url = os.getenv('UPSTASH_VECTOR_REST_URL')
-    token = os.getenv('UPSTASH_VECTOR_REST_TOKEN')
-    
-    if not url or not token:
-        raise ValueError("UPSTASH_VECTOR_REST_URL and UPSTASH_VECTOR_REST_TOKEN must be set")
-    
     print(f"[Upstash] Connecting to vector database...")
-    index = Index(url=url, token=token)
+    index = create_upload_index(UPSTASH_URL, UPSTASH_TOKEN)
     
-    print(f"[Upstash] Uploading {len(chunks)} chunks...")
+    print(f"[Upstash] Uploading chunks as they are created...")
     
-    BATCH_SIZE = 10
-    successful = 0
-    failed = 0
+    successful, failed = await upload_chunks(
+        index,
+        chunks,
+        text=lambda chunk: chunk.data,
+        to_vector=Chunk.to_upsert_dict,
+        label=lambda chunk: f"{chunk.id}: {chunk.title}"
+    )
     
-    for i in range(0, len(chunks), BATCH_SIZE):
-        batch = chunks[i:i + BATCH_SIZE]
-        batch_num = (i // BATCH_SIZE) + 1
-        total_batches = (len(chunks) + BATCH_SIZE - 1) // BATCH_SIZE
-        
-        print(f"[Upstash] Batch {batch_num}/{total_batches} ({len(batch)} items)...")
-        
-        for chunk in batch:
-            try:
-                index.upsert(vectors=[chunk])
-                successful += 1
-                print(f"  ✓ {chunk['id']}: {chunk['metadata']['title']}")
-            except Exception as e:
-                failed += 1
-                print(f"  ✗ {chunk['id']}: {str(e)}")
-        
-        if i + BATCH_SIZE < len(chunks):
-            time.sleep(0.5)
-    
-    print(f"\n[Complete] Uploaded {successful}/{len(chunks)} chunks")
+    # The index no longer matches the CLI's last ingest
+    clear_ingest_hash()
+    print(f"\n[Complete] Uploaded {successful}/{successful + failed} chunks")
     return successful, failed
 
 def main():
@@ -337,17 +340,10 @@ def main():
     print("=" * 70)
     
     try:
-        # Load data
-        with open('digitaltwin.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        print("✓ Loaded digitaltwin.json")
-        
-        # Create comprehensive chunks
-        chunks = create_comprehensive_chunks(data)
-        print(f"✓ Created {len(chunks)} embedding chunks from all sections")
+        # Parse digitaltwin.json and upload chunks as they are built
+        chunks = dedupe_chunks(create_comprehensive_chunks('digitaltwin.json'))
         
-        # Upload to Upstash
-        successful, failed = embed_to_upstash(chunks)
+        successful, failed = asyncio.run(embed_to_upstash(chunks))
         
         print("\n" + "=" * 70)
         print(f"COMPLETE! Uploaded {successful} vectors to Upstash")
@@ -6,97 +6,74 @@ Embeds all content chunks from digitaltwin.json into Upstash Vector Database
 
 # Essential imports for Digital Twin RAG System
 import os
-import json
+import sys
+import asyncio
+from functools import lru_cache
+import ijson
 from dotenv import load_dotenv
-from upstash_vector import Index
-import time
 
 # Load environment variables
 load_dotenv('.env.local')  # Load from .env.local instead of .env
 
+# Upload helpers are shared with embed_all_data.py and the CLI; their batch
+# settings read the environment, so import them once .env.local is loaded
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from ingest_state import clear_ingest_hash
+from vector_upload import create_upload_index, upload_chunks
+
+# Upstash credentials are read once; fail fast before any data is parsed
+UPSTASH_URL = os.getenv('UPSTASH_VECTOR_REST_URL')
+UPSTASH_TOKEN = os.getenv('UPSTASH_VECTOR_REST_TOKEN')
+if not UPSTASH_URL or not UPSTASH_TOKEN:
+    raise ValueError("UPSTASH_VECTOR_REST_URL and UPSTASH_VECTOR_REST_TOKEN must be set in .env.local")
+
 def load_digital_twin_data(file_path='digitaltwin.json'):
-    """Load digital twin data from JSON file"""
+    """Stream content chunks from the JSON file one record at a time"""
     print(f"[Load] Reading data from {file_path}...")
-    with open(file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    print(f"[Load] Loaded data structure successfully")
-    return data
+    with open(file_path, 'rb') as f:
+        yield from ijson.items(f, 'content_chunks.item', use_float=True)
 
-def prepare_content_chunks(data):
-    """Extract and prepare content chunks for embedding"""
-    chunks = data.get('content_chunks', [])
-    print(f"[Prepare] Found {len(chunks)} content chunks to embed")
-    
-    # Prepare data for Upstash Vector
-    prepared_chunks = []
+def prepare_content_chunks(chunks):
+    """Reshape content chunks for Upstash Vector in place, yielding one at a time"""
+    count = 0
     for chunk in chunks:
-        chunk_data = {
-            'id': chunk['id'],
-            'data': chunk['content'],  # The actual content to embed
-            'metadata': {
-                'title': chunk.get('title', ''),
-                'type': chunk.get('type', ''),
-                'content': chunk['content'],  # Store content in metadata for retrieval
-                'category': chunk.get('metadata', {}).get('category', ''),
-                'tags': chunk.get('metadata', {}).get('tags', [])
-            }
+        source_metadata = chunk.get('metadata', {})
+        chunk['data'] = chunk['content']  # The actual content to embed
+        chunk['metadata'] = {
+            'title': chunk.pop('title', ''),
+            'type': chunk.pop('type', ''),
+            'content': chunk.pop('content'),  # Store content in metadata for retrieval
+            'category': source_metadata.get('category', ''),
+            'tags': source_metadata.get('tags', [])
         }
-        prepared_chunks.append(chunk_data)
+        count += 1
+        yield chunk
     
-    return prepared_chunks
+    print(f"[Prepare] Prepared {count} content chunks for embedding")
 
-def embed_to_upstash(chunks):
-    """Embed content chunks into Upstash Vector database"""
-    
-    # Validate environment variables
-    url = os.getenv('UPSTASH_VECTOR_REST_URL')
-    token = os.getenv('UPSTASH_VECTOR_REST_TOKEN')
-    
-    if not url or not token:
-        raise ValueError("UPSTASH_VECTOR_REST_URL and UPSTASH_VECTOR_REST_TOKEN must be set in .env.local")
-    
+@lru_cache(maxsize=1)
+def get_index():
+    """Build the Upstash client once; the embed and verify steps share it"""
     print(f"[Upstash] Connecting to vector database...")
-    index = Index(url=url, token=token)
-    
-    print(f"[Upstash] Starting to upsert {len(chunks)} chunks...")
-    
-    # Batch upsert for efficiency
-    BATCH_SIZE = 10
-    total_chunks = len(chunks)
-    successful = 0
-    failed = 0
+    return create_upload_index(UPSTASH_URL, UPSTASH_TOKEN)
+
+async def embed_to_upstash(chunks, index):
+    """Embed content chunks into Upstash Vector database"""
+    print(f"[Upstash] Starting to upsert chunks...")
     
-    for i in range(0, total_chunks, BATCH_SIZE):
-        batch = chunks[i:i + BATCH_SIZE]
-        batch_num = (i // BATCH_SIZE) + 1
-        total_batches = (total_chunks + BATCH_SIZE - 1) // BATCH_SIZE
-        
-        try:
-            print(f"[Upstash] Processing batch {batch_num}/{total_batches} ({len(batch)} items)...")
-            
-            # Upsert batch
-            for chunk in batch:
-                try:
-                    index.upsert(
-                        vectors=[{
-                            'id': chunk['id'],
-                            'data': chunk['data'],
-                            'metadata': chunk['metadata']
-                        }]
-                    )
-                    successful += 1
-                    print(f"  ✓ Embedded: {chunk['id']} - {chunk['metadata']['title']}")
-                except Exception as e:
-                    failed += 1
-                    print(f"  ✗ Failed: {chunk['id']} - {str(e)}")
-            
-            # Small delay between batches to avoid rate limits
-            if i + BATCH_SIZE < total_chunks:
-                time.sleep(0.5)
-                
-        except Exception as e:
-            print(f"[Error] Batch {batch_num} failed: {str(e)}")
-            failed += len(batch)
+    # Batch upsert for efficiency, several batches in flight at once; sorting
+    # by length keeps texts in each batch a similar size for the server-side embedder
+    successful, failed = await upload_chunks(
+        index,
+        chunks,
+        text=lambda chunk: chunk['data'],
+        to_vector=lambda chunk: chunk,
+        label=lambda chunk: f"{chunk['id']}: {chunk['metadata']['title']}"
+    )
+    total_chunks = successful + failed
+    # The index no longer matches the CLI's last ingest
+    clear_ingest_hash()
     
     print(f"\n[Complete] Embedding finished:")
     print(f"  ✓ Successful: {successful}/{total_chunks}")
@@ -104,27 +81,46 @@ def embed_to_upstash(chunks):
     
     return successful, failed
 
-def verify_embeddings(sample_ids):
+async def verify_embeddings(sample_ids, index):
     """Verify that embeddings were successfully created"""
-    url = os.getenv('UPSTASH_VECTOR_REST_URL')
-    token = os.getenv('UPSTASH_VECTOR_REST_TOKEN')
-    
     print(f"\n[Verify] Checking sample embeddings...")
-    index = Index(url=url, token=token)
     
-    for chunk_id in sample_ids[:3]:  # Check first 3
-        try:
-            result = index.query(
-                data=chunk_id,
-                top_k=1,
-                include_metadata=True
-            )
-            if result:
-                print(f"  ✓ Found: {chunk_id}")
-            else:
-                print(f"  ✗ Not found: {chunk_id}")
-        except Exception as e:
-            print(f"  ✗ Error checking {chunk_id}: {str(e)}")
+    # Fetch the first 3 by id in one request (no query embedding needed)
+    sample_ids = sample_ids[:3]
+    try:
+        results = await index.fetch(ids=sample_ids)
+    except Exception as e:
+        print(f"  ✗ Error checking {', '.join(sample_ids)}: {str(e)}")
+        return
+    
+    for chunk_id, result in zip(sample_ids, results):
+        if result:
+            print(f"  ✓ Found: {chunk_id}")
+        else:
+            print(f"  ✗ Not found: {chunk_id}")
+
+async def embed_and_verify(chunks):
+    """Upload chunks, then spot-check a few, over one Upstash client"""
+    index = get_index()
+    sample_ids = []
+    
+    def remember_sample_ids(chunks):
+        for chunk in chunks:
+            if len(sample_ids) < 3:
+                sample_ids.append(chunk['id'])
+            yield chunk
+    
+    # Step 3: Embed to Upstash
+    successful, failed = await embed_to_upstash(remember_sample_ids(chunks), index)
+    
+    if not sample_ids:
+        print("[Error] No content chunks found in digitaltwin.json")
+    
+    # Step 4: Verify (optional)
+    if successful > 0:
+        await verify_embeddings(sample_ids, index)
+    
+    return successful, failed
 
 def main():
     """Main execution function"""
@@ -134,22 +130,13 @@ def main():
     
     try:
         # Step 1: Load data
-        data = load_digital_twin_data()
-        
-        # Step 2: Prepare chunks
-        chunks = prepare_content_chunks(data)
-        
-        if not chunks:
-            print("[Error] No content chunks found in digitaltwin.json")
-            return
+        raw_chunks = load_digital_twin_data()
         
-        # Step 3: Embed to Upstash
-        successful, failed = embed_to_upstash(chunks)
+        # Step 2: Prepare chunks lazily, as they are uploaded
+        chunks = prepare_content_chunks(raw_chunks)
         
-        # Step 4: Verify (optional)
-        if successful > 0:
-            chunk_ids = [c['id'] for c in chunks]
-            verify_embeddings(chunk_ids)
+        # Steps 3-4: Embed to Upstash and verify
+        asyncio.run(embed_and_verify(chunks))
         
         print("\n" + "=" * 60)
         print("Embedding process completed!")
@@ -157,7 +144,7 @@ def main():
         
     except FileNotFoundError:
         print("[Error] digitaltwin.json not found in current directory")
-    except json.JSONDecodeError:
+    except ijson.JSONError:
         print("[Error] Invalid JSON format in digitaltwin.json")
     except Exception as e:
         print(f"[Error] Unexpected error: {str(e)}")
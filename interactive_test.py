@@ -13,8 +13,34 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from digital_twin_mcp_server import (
     query_vector_db,
+    result_content,
     generate_response
 )
+from semantic_cache import exact_key
+
+# Per-session caches so repeated menu picks skip the vector query and the LLM call
+session_results = {}
+session_responses = {}
+
+def cached_query(question: str):
+    """query_vector_db, reusing this session's results for the same question"""
+    key = exact_key(question)
+    if key not in session_results:
+        results = query_vector_db(question, top_k=3)
+        if not results:
+            return results
+        session_results[key] = results
+    return session_results[key]
+
+def cached_response(question: str, prompt: str) -> str:
+    """generate_response, reusing this session's answer to the same question"""
+    key = exact_key(question)
+    if key not in session_responses:
+        response = generate_response(prompt)
+        if response.startswith("Error generating response"):
+            return response
+        session_responses[key] = response
+    return session_responses[key]
 
 def test_tool(tool_name: str, **kwargs):
     """Test a specific tool"""
@@ -26,7 +52,7 @@ def test_tool(tool_name: str, **kwargs):
         question = kwargs.get('question', 'What are your skills?')
         print(f"Question: {question}\n")
         
-        results = query_vector_db(question, top_k=3)
+        results = cached_query(question)
         
         if not results:
             print("❌ No results found")
@@ -38,7 +64,7 @@ def test_tool(tool_name: str, **kwargs):
         for i, result in enumerate(results, 1):
             metadata = result.metadata or {}
             title = metadata.get('title', 'Unknown')
-            content = metadata.get('content', '')
+            content = result_content(result)
             score = result.score
             print(f"{i}. {title} (score: {score:.3f})")
             if content:
@@ -56,7 +82,7 @@ Question: {question}
 Answer:"""
         
         print("\n💭 Generating response...\n")
-        response = generate_response(prompt)
+        response = cached_response(question, prompt)
         print(f"📝 Response:\n{response}\n")
     
     elif tool_name == "analyze_job_fit":
@@ -67,7 +93,9 @@ Answer:"""
         
         print(f"Job Description:\n{job_desc}\n")
         
-        results = query_vector_db(f"skills experience {job_desc[:200]}", top_k=5)
+        # Only the opening of the description goes into the search query
+        summary = job_desc[:200]
+        results = query_vector_db(f"skills experience {summary}", top_k=5)
         
         if not results:
             print("❌ No matching information found")
@@ -78,7 +106,7 @@ Answer:"""
         context_parts = []
         for result in results:
             metadata = result.metadata or {}
-            content = metadata.get('content', '')
+            content = result_content(result)
             if content:
                 context_parts.append(content[:200])
         
@@ -131,7 +159,7 @@ def main():
                 if line == "":
                     break
                 lines.append(line)
-            job_desc = "\n".join(lines)
+            job_desc = "\n".join(lines).strip()
             if job_desc:
                 test_tool("analyze_job_fit", job_description=job_desc)
         
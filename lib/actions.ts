@@ -7,7 +7,7 @@
  * Enhanced with LLM-powered query preprocessing and response formatting
  */
 
-import { vectorIndex, type QueryResult } from "./upstash";
+import { vectorIndex, resultContent, type QueryResult } from "./upstash";
 import { generateResponse } from "./groq";
 import {
   enhanceQuery,
@@ -200,6 +200,7 @@ export async function queryVectors(
       data: queryText,
       topK,
       includeMetadata: true,
+      includeData: true,
     });
 
     const duration = Date.now() - startTime;
@@ -275,10 +276,10 @@ export async function performRAGQuery(question: string): Promise<RAGResponse> {
     );
     const topDocs: string[] = [];
     const sources = results
-      .filter((result) => result.metadata?.content)
+      .filter((result) => resultContent(result))
       .map((result) => {
         const title = (result.metadata?.title as string) || "Information";
-        const content = (result.metadata?.content as string) || "";
+        const content = resultContent(result);
 
         // Only add content without title to avoid LLM referencing section names
         topDocs.push(content);
@@ -413,10 +414,10 @@ export async function performEnhancedRAGQuery(
       `[Enhanced RAG] Step 3: Extracting content from ${results.length} results...`
     );
     const sources = results
-      .filter((result) => result.metadata?.content)
+      .filter((result) => resultContent(result))
       .map((result) => {
         const title = (result.metadata?.title as string) || "Information";
-        const content = (result.metadata?.content as string) || "";
+        const content = resultContent(result);
 
         return {
           title,
@@ -4,6 +4,7 @@
  */
 
 import Groq from "groq-sdk";
+import { resultContent } from "./upstash";
 
 const groq = new Groq({
   apiKey: process.env.GROQ_API_KEY!,
@@ -92,15 +93,17 @@ Return only the enhanced search query (no explanation):`;
  * Applies STAR format when appropriate
  */
 export async function formatForInterview(
-  ragResults: Array<{ metadata?: Record<string, unknown>; score: number }>,
+  ragResults: Array<{
+    metadata?: Record<string, unknown>;
+    data?: unknown;
+    score: number;
+  }>,
   originalQuestion: string
 ): Promise<string> {
   const context = ragResults
     .map((result) => {
-      const metadata = result.metadata as
-        | { content?: string; title?: string }
-        | undefined;
-      const content = metadata?.content || "";
+      const metadata = result.metadata as { title?: string } | undefined;
+      const content = resultContent(result);
       const title = metadata?.title || "";
 
       // Debug: log what we're extracting
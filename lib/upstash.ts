@@ -67,6 +67,28 @@ export interface ContentChunk {
     category?: string;
     tags?: string[];
   };
+  data?: string;
+}
+
+/**
+ * Chunk text of a query result
+ * Falls back to the embedded data when metadata has no copy of the content
+ * (the Python ingestion stores it once, as "title: content")
+ */
+export function resultContent(result: {
+  metadata?: Record<string, unknown>;
+  data?: unknown;
+}): string {
+  const content = result.metadata?.content;
+  if (typeof content === "string" && content) {
+    return content;
+  }
+  const data = typeof result.data === "string" ? result.data : "";
+  const title = result.metadata?.title;
+  if (typeof title === "string" && title && data.startsWith(`${title}: `)) {
+    return data.slice(title.length + 2);
+  }
+  return data;
 }
 
 /**
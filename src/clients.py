@@ -0,0 +1,75 @@
+"""
+Shared API Clients
+Upstash Vector and Groq clients for the CLI and the MCP server, all
+sending requests through pooled keep-alive HTTP clients (one sync, one async)
+"""
+
+import importlib.util
+import os
+
+import httpx
+from dotenv import load_dotenv
+from groq import AsyncGroq, Groq
+from upstash_vector import Index
+
+from local_index import LOCAL_INDEX_PATH, VECTOR_BACKEND, LocalIndex
+
+# Load environment variables
+load_dotenv()
+
+# Constants
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "100"))
+HTTP_LIMITS = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE)
+# Per-read limits: they bound the wait for the first byte and any stall mid-stream, not a whole streamed answer.
+# HTTP_TIMEOUT is the pools' default and covers the vector calls; Groq requests pass GROQ_TIMEOUT
+# instead, matching the Groq SDK's own defaults (60s read, 5s connect)
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "600"))
+HTTP_TIMEOUT = httpx.Timeout(timeout=HTTP_READ_TIMEOUT, connect=10.0)
+GROQ_READ_TIMEOUT = float(os.getenv("GROQ_READ_TIMEOUT", "60"))
+GROQ_TIMEOUT = httpx.Timeout(timeout=GROQ_READ_TIMEOUT, connect=5.0)
+# HTTP/2 needs the optional h2 package; without it the pools stay on HTTP/1.1
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+http_client = httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT, http2=HTTP2)
+async_http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT, http2=HTTP2)
+
+
+class PooledIndex(Index):
+    """upstash_vector.Index sending its requests through the shared HTTP client"""
+
+    def __init__(self, url: str, token: str, client: httpx.Client = http_client, **kwargs):
+        super().__init__(url=url, token=token, **kwargs)
+        # Index has no http_client parameter, so replace the private client it
+        # builds (checked against upstash-vector 0.8). If a later SDK renames
+        # the attribute, keep the SDK's own client instead of failing
+        own_client = getattr(self, "_client", None)
+        if isinstance(own_client, httpx.Client):
+            own_client.close()
+            self._client = client
+
+
+def create_vector_index():
+    """Upstash index on the shared HTTP client, or the saved local index (VECTOR_BACKEND=local)"""
+    if VECTOR_BACKEND == "local":
+        try:
+            return LocalIndex.load(LOCAL_INDEX_PATH)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"No local vector index at {LOCAL_INDEX_PATH}; build it first with "
+                "VECTOR_BACKEND=local python digitaltwin_rag.py"
+            ) from None
+    return PooledIndex(
+        url=os.getenv("UPSTASH_VECTOR_REST_URL"),
+        token=os.getenv("UPSTASH_VECTOR_REST_TOKEN")
+    )
+
+
+def create_groq_client(api_key: str | None = None) -> Groq:
+    """Groq client on the shared HTTP client, with its own GROQ_TIMEOUT"""
+    return Groq(api_key=api_key or os.getenv("GROQ_API_KEY"), http_client=http_client, timeout=GROQ_TIMEOUT)
+
+
+def create_async_groq_client(api_key: str | None = None) -> AsyncGroq:
+    """AsyncGroq client on the shared async HTTP client, with its own GROQ_TIMEOUT"""
+    return AsyncGroq(api_key=api_key or os.getenv("GROQ_API_KEY"), http_client=async_http_client, timeout=GROQ_TIMEOUT)
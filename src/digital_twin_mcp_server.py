@@ -6,6 +6,7 @@ An MCP server that provides AI-powered professional profile queries using RAG
 
 import asyncio
 import os
+import re
 import json
 from typing import Any
 from dotenv import load_dotenv
@@ -13,35 +14,177 @@ from mcp.server.models import InitializationOptions
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
 import mcp.server.stdio
-from upstash_vector import Index
-from groq import Groq
+
+from clients import create_async_groq_client, create_groq_client, create_vector_index
+from embeddings import warm_up
+from ingest_state import load_chunks_by_type, read_ingest_hash
+from response_cache import ResponseCache, prompt_namespace
+from results import result_content
+from semantic_cache import SemanticCache
 
 # Load environment variables
 load_dotenv()
 
-# Initialize clients
-vector_index = Index(
-    url=os.getenv("UPSTASH_VECTOR_REST_URL"),
-    token=os.getenv("UPSTASH_VECTOR_REST_TOKEN")
-)
+# Initialize clients (VECTOR_BACKEND=local loads the index saved by digitaltwin_rag.py)
+vector_index = create_vector_index()
+groq_client = create_groq_client()
+async_groq_client = create_async_groq_client()
 
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Every query is embedded locally for the semantic cache, so pay the model's
+# load and first-run cost at startup rather than in the first tool call
+warm_up()
 
 # Create server instance
 server = Server("digital-twin")
 
 # Constants
 DEFAULT_MODEL = "llama-3.1-8b-instant"
+MAX_TOKENS = 800
 PROFILE_NAME = "Diwan Malla"
 
+SYSTEM_PROMPT = """You are Diwan Malla. Answer in first person naturally.
+
+RULES:
+- "what is your name?" → "My name is Diwan Malla."
+- "who are you?" → 2-3 sentences: name, current role (Full-Stack Developer), location (Sydney, Australia), key expertise
+- Simple questions → Simple answers (1-2 sentences)
+- Complex questions → Detailed answers with examples, numbers, achievements
+- Always speak as "I" (you ARE Diwan Malla)
+
+Match the question's detail level - don't over-explain simple questions."""
+
+# User prompt templates, split around the retrieved context; the static text
+# comes first so the prompt prefix stays the same across calls
+QUERY_PROMPT_HEAD = """Based on the following information about yourself, answer the question.
+Speak in first person as if you are describing your own background.
+
+Your Information:
+"""
+QUERY_PROMPT_TAIL = """
+
+Question: {question}
+
+Provide a helpful, professional response:"""
+
+JOB_FIT_PROMPT_HEAD = """Analyze how well this professional profile matches the job description.
+
+Provide a detailed analysis covering:
+1. Matching skills and experience
+2. Gaps or areas for development
+3. Relevant projects or achievements
+4. Overall fit score (1-10)
+5. Recommendations for standing out
+
+Profile Information:
+"""
+JOB_FIT_PROMPT_TAIL = """
+
+Job Description:
+{job_description}
+
+Analysis:"""
+
+# Tool definitions, built once and returned by every list_tools call
+TOOLS = [
+    types.Tool(
+        name="query_digital_twin",
+        description="Query the digital twin about Diwan Malla's professional background, skills, experience, projects, or career goals. Returns AI-generated responses based on the actual profile data.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "question": {
+                    "type": "string",
+                    "description": "The question to ask about the person's professional profile"
+                },
+                "no_cache": {
+                    "type": "boolean",
+                    "description": "Optional: Skip the response cache and always generate a fresh answer"
+                }
+            },
+            "required": ["question"]
+        }
+    ),
+    types.Tool(
+        name="get_technical_skills",
+        description="Get a comprehensive list of technical skills including frontend, backend, databases, cloud/devops, and UI/UX tools",
+        inputSchema={
+            "type": "object",
+            "properties": {}
+        }
+    ),
+    types.Tool(
+        name="get_work_experience",
+        description="Get detailed work experience including companies, roles, duration, achievements, and technologies used",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "company": {
+                    "type": "string",
+                    "description": "Optional: Filter by specific company name"
+                }
+            }
+        }
+    ),
+    types.Tool(
+        name="get_projects",
+        description="Get portfolio projects with descriptions, technologies, and impact metrics",
+        inputSchema={
+            "type": "object",
+            "properties": {}
+        }
+    ),
+    types.Tool(
+        name="analyze_job_fit",
+        description="Analyze how well the profile matches a job description. Provide a job description and get a detailed fit analysis.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "job_description": {
+                    "type": "string",
+                    "description": "The job description to analyze against the profile"
+                },
+                "no_cache": {
+                    "type": "boolean",
+                    "description": "Optional: Skip the response cache and always generate a fresh analysis"
+                }
+            },
+            "required": ["job_description"]
+        }
+    )
+]
+
+query_cache = SemanticCache()
+# Namespaced by the prompts, so the CLI's answers in the same file aren't served here
+response_cache = ResponseCache(namespace=prompt_namespace(
+    SYSTEM_PROMPT, QUERY_PROMPT_HEAD, QUERY_PROMPT_TAIL, JOB_FIT_PROMPT_HEAD, JOB_FIT_PROMPT_TAIL, MAX_TOKENS
+))
+
+
+# Skills, experience and projects are static, so those tools read them from
+# the chunks saved by digitaltwin_rag.py and only fall back to a vector query
+# when a type is missing or the saved chunks are stale
+CHUNKS_INGEST_HASH, CHUNKS_BY_TYPE = load_chunks_by_type()
+
+
+def saved_chunks(chunk_type: str) -> list[dict] | None:
+    """Saved chunks of chunk_type, or None if the index was re-ingested or written to since they were saved"""
+    if CHUNKS_INGEST_HASH is None or CHUNKS_INGEST_HASH != read_ingest_hash():
+        return None
+    return CHUNKS_BY_TYPE.get(chunk_type)
+
 
 def query_vector_db(query: str, top_k: int = 3) -> list[dict[str, Any]]:
     """Query Upstash Vector database for relevant profile information"""
     try:
-        results = vector_index.query(
-            data=query,
-            top_k=top_k,
-            include_metadata=True
+        results = query_cache.get_or_compute(
+            query,
+            lambda: vector_index.query(
+                data=query,
+                top_k=top_k,
+                include_metadata=True,
+                include_data=True
+            ),
+            namespace=top_k
         )
         return results
     except Exception as e:
@@ -49,263 +192,381 @@ def query_vector_db(query: str, top_k: int = 3) -> list[dict[str, Any]]:
         return []
 
 
-def generate_response(prompt: str, model: str = DEFAULT_MODEL) -> str:
-    """Generate response using Groq"""
+def fetch_vector_db_batch(queries: list[str], top_k: int = 3) -> list[list]:
+    """query_vector_db_batch, raising on failure instead of returning empty results"""
+    return query_cache.get_or_compute_many(
+        queries,
+        lambda missing: vector_index.query_many(queries=[
+            {"data": query, "top_k": top_k, "include_metadata": True, "include_data": True}
+            for query in missing
+        ]),
+        namespace=top_k
+    )
+
+
+def query_vector_db_batch(queries: list[str], top_k: int = 3) -> list[list]:
+    """Query the vector database for several queries in one request, one result list per query"""
     try:
-        completion = groq_client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are Diwan Malla. Answer in first person naturally.
+        return fetch_vector_db_batch(queries, top_k)
+    except Exception as e:
+        print(f"Error querying vector database: {e}")
+        return [[] for _ in queries]
 
-RULES:
-- "what is your name?" → "My name is Diwan Malla."
-- "who are you?" → 2-3 sentences: name, current role (Full-Stack Developer), location (Sydney, Australia), key expertise
-- Simple questions → Simple answers (1-2 sentences)
-- Complex questions → Detailed answers with examples, numbers, achievements
-- Always speak as "I" (you ARE Diwan Malla)
 
-Match the question's detail level - don't over-explain simple questions."""
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=800
-        )
-        return completion.choices[0].message.content.strip()
+async def aquery_vector_db(query: str, top_k: int = 3) -> list[dict[str, Any]]:
+    """Query the vector database without blocking the event loop"""
+    return await asyncio.to_thread(query_vector_db, query, top_k)
+
+
+STOPWORDS = frozenset("""
+a about above across after all also an and any are as at be been being both but by can could do does
+each either etc for from has have having how if in into is it its just may more most must our ours
+of on or other over per plus should so such than that the their them then there these they this those
+through to under up us using via was we well were what when where which while who will with within
+would you your ability able candidate experience including join looking new role skills strong team
+work working years year required requirements preferred responsibilities knowledge understanding
+position positions roles requiring require requires seeking hiring opportunity company apply
+applicant applicants developer developers engineer engineers senior junior mid-level level familiarity
+""".split())
+TERM_RE = re.compile(r"[a-z][a-z0-9+#./-]*[a-z0-9+#]")
+
+
+def keywords(text: str, k: int = 10) -> list[str]:
+    """Return the k most frequent non-stopword terms in text, ties broken by first appearance"""
+    counts = {}
+    for term in TERM_RE.findall(text.lower()):
+        if term not in STOPWORDS:
+            counts[term] = counts.get(term, 0) + 1
+    return sorted(counts, key=counts.get, reverse=True)[:k]
+
+
+def unique_results(results: list) -> list:
+    """Drop results whose chunk id already appeared, keeping the first (best-ranked) one"""
+    seen_ids = set()
+    unique = []
+    for result in results:
+        if result.id not in seen_ids:
+            seen_ids.add(result.id)
+            unique.append(result)
+    return unique
+
+
+def merge_results(result_sets: list[list], top_k: int) -> list:
+    """Merge query results by id, keeping each id's best score"""
+    best = {}
+    for results in result_sets:
+        for result in results:
+            if result.id not in best or result.score > best[result.id].score:
+                best[result.id] = result
+    return sorted(best.values(), key=lambda r: r.score, reverse=True)[:top_k]
+
+
+def build_prompt(head: str, docs: list[str], separator: str, tail: str) -> str:
+    """Assemble head + separator-joined docs + tail, copying the context only once"""
+    parts = [head]
+    for doc in docs:
+        parts += (doc, separator)
+    if docs:
+        parts.pop()
+    parts.append(tail)
+    return "".join(parts)
+
+
+def chat_request(prompt: str, model: str) -> dict:
+    """Keyword arguments for a streamed Groq chat completion"""
+    return dict(
+        model=model,
+        messages=[
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        temperature=0.7,
+        max_tokens=MAX_TOKENS,
+        stream=True
+    )
+
+
+def generate_response(prompt: str, model: str = DEFAULT_MODEL, cache_key: str | None = None, context_ids=()) -> str:
+    """Generate response using Groq, reusing the answer to a similar cache_key over the same context_ids if given"""
+    try:
+        if cache_key:
+            cached = response_cache.get(cache_key, model, context_ids)
+            if cached:
+                return cached
+        
+        completion = groq_client.chat.completions.create(**chat_request(prompt, model))
+        # Read the stream as it is generated; MCP returns the whole text at once
+        response = "".join(
+            chunk.choices[0].delta.content or ""
+            for chunk in completion
+            if chunk.choices
+        ).strip()
+        if cache_key:
+            response_cache.put(cache_key, model, response, context_ids)
+        return response
     except Exception as e:
         return f"Error generating response: {e}"
 
 
-@server.list_tools()
-async def handle_list_tools() -> list[types.Tool]:
-    """List available tools"""
-    return [
-        types.Tool(
-            name="query_digital_twin",
-            description="Query the digital twin about Diwan Malla's professional background, skills, experience, projects, or career goals. Returns AI-generated responses based on the actual profile data.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "question": {
-                        "type": "string",
-                        "description": "The question to ask about the person's professional profile"
-                    }
-                },
-                "required": ["question"]
-            }
-        ),
-        types.Tool(
-            name="get_technical_skills",
-            description="Get a comprehensive list of technical skills including frontend, backend, databases, cloud/devops, and UI/UX tools",
-            inputSchema={
-                "type": "object",
-                "properties": {}
-            }
-        ),
-        types.Tool(
-            name="get_work_experience",
-            description="Get detailed work experience including companies, roles, duration, achievements, and technologies used",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "company": {
-                        "type": "string",
-                        "description": "Optional: Filter by specific company name"
-                    }
-                }
-            }
-        ),
-        types.Tool(
-            name="get_projects",
-            description="Get portfolio projects with descriptions, technologies, and impact metrics",
-            inputSchema={
-                "type": "object",
-                "properties": {}
-            }
-        ),
-        types.Tool(
-            name="analyze_job_fit",
-            description="Analyze how well the profile matches a job description. Provide a job description and get a detailed fit analysis.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "job_description": {
-                        "type": "string",
-                        "description": "The job description to analyze against the profile"
-                    }
-                },
-                "required": ["job_description"]
-            }
-        )
-    ]
+def chunk_usage(chunk) -> dict | None:
+    """Prompt and cached token counts from a stream chunk, if it carries usage (the last one does)
+    
+    Never raises: older groq SDKs lack some of these fields, and a missing
+    count must not cost the answer that was already streamed
+    """
+    usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0
+    }
 
 
-@server.call_tool()
-async def handle_call_tool(
-    name: str,
-    arguments: dict | None
-) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-    """Handle tool execution"""
+async def astream_response_with_usage(prompt: str, model: str = DEFAULT_MODEL, cache_key: str | None = None, context_ids=(), on_token=None) -> tuple[str, dict]:
+    """agenerate_response_with_usage, raising on failure instead of returning an error message
     
-    if name == "query_digital_twin":
-        question = arguments.get("question", "") if arguments else ""
-        
-        if not question:
-            return [types.TextContent(
-                type="text",
-                text="Please provide a question to ask the digital twin."
-            )]
-        
-        # Query vector database
-        results = query_vector_db(question, top_k=3)
-        
-        if not results:
-            return [types.TextContent(
-                type="text",
-                text="I don't have specific information about that topic in my profile."
-            )]
-        
-        # Extract relevant context
-        context_parts = []
-        for result in results:
-            metadata = result.metadata or {}
-            title = metadata.get('title', 'Information')
-            content = metadata.get('content', '')
-            if content:
-                context_parts.append(f"{title}: {content}")
-        
-        context = "\n\n".join(context_parts)
-        
-        # Generate response
-        prompt = f"""Based on the following information about yourself, answer the question.
-Speak in first person as if you are describing your own background.
+    Streams tokens to on_token as they arrive (nothing is streamed for a cached answer)
+    """
+    usage = {"prompt_tokens": 0, "cached_tokens": 0}
+    if cache_key:
+        cached = response_cache.get(cache_key, model, context_ids)
+        if cached:
+            return cached, usage
+    
+    completion = await async_groq_client.chat.completions.create(**chat_request(prompt, model))
+    parts = []
+    async for chunk in completion:
+        token = chunk.choices[0].delta.content if chunk.choices else None
+        if token:
+            parts.append(token)
+            if on_token:
+                on_token(token)
+        usage = chunk_usage(chunk) or usage
+    response = "".join(parts).strip()
+    if cache_key:
+        response_cache.put(cache_key, model, response, context_ids)
+    return response, usage
 
-Your Information:
-{context}
 
-Question: {question}
+async def agenerate_response_with_usage(prompt: str, model: str = DEFAULT_MODEL, cache_key: str | None = None, context_ids=(), on_token=None) -> tuple[str, dict]:
+    """agenerate_response plus Groq's prompt/cached token counts (zero when Groq was not called)
+    
+    Streams tokens to on_token as they arrive (nothing is streamed for a cached answer)
+    """
+    try:
+        return await astream_response_with_usage(prompt, model, cache_key, context_ids, on_token)
+    except Exception as e:
+        return f"Error generating response: {e}", {"prompt_tokens": 0, "cached_tokens": 0}
 
-Provide a helpful, professional response:"""
-        
-        response = generate_response(prompt)
-        
+
+async def agenerate_response(prompt: str, model: str = DEFAULT_MODEL, cache_key: str | None = None, context_ids=()) -> str:
+    """generate_response on the async Groq client, so the event loop keeps serving while it waits"""
+    response, _ = await agenerate_response_with_usage(prompt, model, cache_key, context_ids)
+    return response
+
+
+@server.list_tools()
+async def handle_list_tools() -> list[types.Tool]:
+    """List available tools"""
+    return TOOLS
+
+
+async def handle_query_digital_twin(arguments: dict) -> list[types.TextContent]:
+    """Answer a question about the profile with RAG"""
+    question = arguments.get("question", "")
+    no_cache = bool(arguments.get("no_cache", False))
+    
+    if not question:
         return [types.TextContent(
             type="text",
-            text=response
+            text="Please provide a question to ask the digital twin."
         )]
     
-    elif name == "get_technical_skills":
+    # Query vector database
+    results = await aquery_vector_db(question, top_k=3)
+    
+    if not results:
+        return [types.TextContent(
+            type="text",
+            text="I don't have specific information about that topic in my profile."
+        )]
+    
+    # Extract relevant context, each chunk once
+    results = unique_results(results)
+    context_parts = []
+    for result in results:
+        metadata = result.metadata or {}
+        title = metadata.get('title', 'Information')
+        content = result_content(result)
+        if content:
+            context_parts.append(f"{title}: {content}")
+    
+    # Generate response
+    prompt = build_prompt(QUERY_PROMPT_HEAD, context_parts, "\n\n", QUERY_PROMPT_TAIL.format(question=question))
+    
+    response = await agenerate_response(
+        prompt,
+        cache_key=None if no_cache else question,
+        context_ids=[result.id for result in results]
+    )
+    
+    return [types.TextContent(
+        type="text",
+        text=response
+    )]
+
+
+async def handle_get_technical_skills(arguments: dict) -> list[types.TextContent]:
+    """Return technical skills from the profile"""
+    chunks = saved_chunks('skills')
+    if chunks:
+        skills_data = [chunk['content'] for chunk in chunks]
+    else:
         # Query for skills
-        results = query_vector_db("technical skills programming languages frameworks", top_k=2)
+        results = await aquery_vector_db("technical skills programming languages frameworks", top_k=2)
         
         skills_data = []
         for result in results:
-            metadata = result.metadata or {}
-            content = metadata.get('content', '')
+            content = result_content(result)
             if content:
                 skills_data.append(content)
-        
-        skills_text = "\n\n".join(skills_data) if skills_data else "Skills information not found"
-        
-        return [types.TextContent(
-            type="text",
-            text=f"**Technical Skills:**\n\n{skills_text}"
-        )]
     
-    elif name == "get_work_experience":
-        company_filter = arguments.get("company", "") if arguments else ""
-        
+    skills_text = "\n\n".join(skills_data) if skills_data else "Skills information not found"
+    
+    return [types.TextContent(
+        type="text",
+        text=f"**Technical Skills:**\n\n{skills_text}"
+    )]
+
+
+async def handle_get_work_experience(arguments: dict) -> list[types.TextContent]:
+    """Return work experience, optionally filtered by company"""
+    company_filter = arguments.get("company", "")
+    
+    chunks = saved_chunks('experience')
+    if chunks:
+        company = company_filter.lower()
+        experience_parts = [
+            f"**{chunk['title']}**\n{chunk['content']}"
+            for chunk in chunks
+            if company in chunk['title'].lower() or company in chunk['content'].lower()
+        ]
+    else:
         query = f"work experience {company_filter}" if company_filter else "work experience employment history"
-        results = query_vector_db(query, top_k=4)
+        results = await aquery_vector_db(query, top_k=4)
         
         experience_parts = []
         for result in results:
             metadata = result.metadata or {}
             if metadata.get('type') == 'experience':
                 title = metadata.get('title', '')
-                content = metadata.get('content', '')
+                content = result_content(result)
                 if content:
                     experience_parts.append(f"**{title}**\n{content}")
-        
-        experience_text = "\n\n".join(experience_parts) if experience_parts else "Experience information not found"
-        
-        return [types.TextContent(
-            type="text",
-            text=f"**Work Experience:**\n\n{experience_text}"
-        )]
     
-    elif name == "get_projects":
-        results = query_vector_db("projects portfolio applications built", top_k=4)
+    experience_text = "\n\n".join(experience_parts) if experience_parts else "Experience information not found"
+    
+    return [types.TextContent(
+        type="text",
+        text=f"**Work Experience:**\n\n{experience_text}"
+    )]
+
+
+async def handle_get_projects(arguments: dict) -> list[types.TextContent]:
+    """Return portfolio projects"""
+    chunks = saved_chunks('project')
+    if chunks:
+        project_parts = [f"**{chunk['title']}**\n{chunk['content']}" for chunk in chunks]
+    else:
+        results = await aquery_vector_db("projects portfolio applications built", top_k=4)
         
         project_parts = []
         for result in results:
             metadata = result.metadata or {}
             if metadata.get('type') == 'project' or 'project' in metadata.get('category', '').lower():
                 title = metadata.get('title', '')
-                content = metadata.get('content', '')
+                content = result_content(result)
                 if content:
                     project_parts.append(f"**{title}**\n{content}")
-        
-        projects_text = "\n\n".join(project_parts) if project_parts else "Project information not found"
-        
+    
+    projects_text = "\n\n".join(project_parts) if project_parts else "Project information not found"
+    
+    return [types.TextContent(
+        type="text",
+        text=f"**Portfolio Projects:**\n\n{projects_text}"
+    )]
+
+
+async def handle_analyze_job_fit(arguments: dict) -> list[types.TextContent]:
+    """Analyze how well the profile fits a job description"""
+    job_description = arguments.get("job_description", "")
+    no_cache = bool(arguments.get("no_cache", False))
+    
+    if not job_description:
         return [types.TextContent(
             type="text",
-            text=f"**Portfolio Projects:**\n\n{projects_text}"
+            text="Please provide a job description to analyze."
         )]
     
-    elif name == "analyze_job_fit":
-        job_description = arguments.get("job_description", "") if arguments else ""
-        
-        if not job_description:
-            return [types.TextContent(
-                type="text",
-                text="Please provide a job description to analyze."
-            )]
-        
-        # Query for relevant skills and experience
-        results = query_vector_db(f"skills experience {job_description[:200]}", top_k=5)
-        
-        context_parts = []
-        for result in results:
-            metadata = result.metadata or {}
-            content = metadata.get('content', '')
-            if content:
-                context_parts.append(content)
-        
-        context = "\n".join(context_parts)
-        
-        # Generate fit analysis
-        prompt = f"""Analyze how well this professional profile matches the job description.
+    # Query for relevant skills and experience: the description itself, plus
+    # one lookup per group of its keywords
+    terms = keywords(job_description, 12)
+    queries = [job_description[:200]] + [" ".join(terms[i:i + 4]) for i in range(0, len(terms), 4)]
+    result_sets = await asyncio.to_thread(query_vector_db_batch, queries, 3)
+    results = merge_results(result_sets, top_k=5)
+    
+    context_parts = []
+    for result in results:
+        content = result_content(result)
+        if content:
+            context_parts.append(content)
+    
+    # Generate fit analysis
+    prompt = build_prompt(
+        JOB_FIT_PROMPT_HEAD, context_parts, "\n", JOB_FIT_PROMPT_TAIL.format(job_description=job_description)
+    )
+    
+    analysis = await agenerate_response(
+        prompt,
+        model="llama-3.1-70b-versatile",
+        cache_key=None if no_cache else job_description,
+        context_ids=[result.id for result in results]
+    )
+    
+    return [types.TextContent(
+        type="text",
+        text=analysis
+    )]
 
-Profile Information:
-{context}
 
-Job Description:
-{job_description}
+# Tool name -> handler, so each call is one dict lookup
+TOOL_HANDLERS = {
+    "query_digital_twin": handle_query_digital_twin,
+    "get_technical_skills": handle_get_technical_skills,
+    "get_work_experience": handle_get_work_experience,
+    "get_projects": handle_get_projects,
+    "analyze_job_fit": handle_analyze_job_fit
+}
 
-Provide a detailed analysis covering:
-1. Matching skills and experience
-2. Gaps or areas for development
-3. Relevant projects or achievements
-4. Overall fit score (1-10)
-5. Recommendations for standing out
 
-Analysis:"""
-        
-        analysis = generate_response(prompt, model="llama-3.1-70b-versatile")
-        
-        return [types.TextContent(
-            type="text",
-            text=analysis
-        )]
-    
-    else:
+@server.call_tool()
+async def handle_call_tool(
+    name: str,
+    arguments: dict | None
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    """Handle tool execution"""
+    handler = TOOL_HANDLERS.get(name)
+    if handler is None:
         raise ValueError(f"Unknown tool: {name}")
+    return await handler(arguments or {})
 
 
 async def main():
@@ -0,0 +1,65 @@
+"""
+Embedding Cache
+Persists query embeddings in SQLite keyed by a SHA-256 of model and text, so
+repeat runs with the same literal queries skip loading and running the model
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# Constants
+EMBED_CACHE_PATH = os.getenv(
+    "EMBED_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "embeddings.sqlite")
+)
+EMBED_CACHE_TTL = int(os.getenv("EMBED_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def cache_key(model: str, text: str) -> str:
+    """Deterministic key for an embedding of text by model"""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed map from cache_key() to a float32 vector, with a TTL"""
+
+    def __init__(self, path: str = EMBED_CACHE_PATH, ttl: int = EMBED_CACHE_TTL):
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> np.ndarray | None:
+        """Return the cached vector for key, if present and not expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector FROM embeddings WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def put(self, key: str, vector: np.ndarray):
+        """Store a vector under key"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings WHERE created_at <= ?", (now - self.ttl,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                (key, vector.astype(np.float32).tobytes(), now)
+            )
+            self._conn.commit()
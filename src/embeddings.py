@@ -0,0 +1,98 @@
+"""
+Local Text Embeddings
+Embeds text in-process so lookups don't need a round-trip to Upstash
+- fastembed (BAAI/bge-small-en-v1.5) when it is installed
+- Otherwise a hashed word + character trigram embedding with no model download;
+  too coarse to tell short, fact-bearing questions apart, so the caches fall
+  back to exact matching without a model (see MODEL_AVAILABLE)
+- Single-text model embeddings persist in .cache/embeddings.sqlite across runs
+"""
+
+import hashlib
+import importlib.util
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache, cache_key
+
+# Constants
+EMBED_MODEL = os.getenv("EMBED_MODEL", "BAAI/bge-small-en-v1.5")
+HASH_DIM = 512
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "128"))
+# Below this many texts, worker-process startup costs more than it saves
+PARALLEL_MIN_TEXTS = 1024
+
+MODEL_AVAILABLE = importlib.util.find_spec("fastembed") is not None
+
+_WORD_RE = re.compile(r"\w+")
+_model = None
+# Hashed embeddings are cheaper to recompute than to look up, so only model ones are persisted
+_disk_cache = EmbeddingCache() if MODEL_AVAILABLE else None
+
+
+def _load_model():
+    """Load the fastembed model once per process, or False if unavailable"""
+    global _model
+    if _model is None:
+        try:
+            from fastembed import TextEmbedding
+            _model = TextEmbedding(EMBED_MODEL)
+        except ImportError:
+            _model = False
+    return _model
+
+
+def _hashed_embedding(text: str) -> np.ndarray:
+    """Bag of hashed words and character trigrams"""
+    vec = np.zeros(HASH_DIM, dtype=np.float32)
+    words = _WORD_RE.findall(text.lower())
+    grams = words + [w[i:i + 3] for w in words if len(w) > 3 for i in range(len(w) - 2)]
+    for gram in grams:
+        h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % HASH_DIM] += 1.0 if h & (1 << 63) else -1.0
+    return vec
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so a dot product is cosine similarity"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def embed_texts(texts: list[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+    """Embed texts into an (n, d) float32 matrix of unit vectors, batch_size texts per model call"""
+    # Embed each distinct text once, then scatter the rows back to every position
+    unique = list(dict.fromkeys(texts))
+    model = _load_model()
+    if model:
+        parallel = os.cpu_count() if len(unique) >= PARALLEL_MIN_TEXTS else None
+        matrix = np.asarray(list(model.embed(unique, batch_size=batch_size, parallel=parallel)), dtype=np.float32)
+    else:
+        matrix = np.stack([_hashed_embedding(t) for t in unique]) if unique else np.zeros((0, HASH_DIM), dtype=np.float32)
+    matrix = _normalize(matrix)
+    if len(unique) == len(texts):
+        return matrix
+    positions = {text: i for i, text in enumerate(unique)}
+    return matrix[[positions[text] for text in texts]]
+
+
+@lru_cache(maxsize=1024)
+def embed_text(text: str) -> np.ndarray:
+    """Embed a single text into a unit vector (read-only, memoized in memory and on disk)"""
+    key = cache_key(EMBED_MODEL, text) if _disk_cache else None
+    vec = _disk_cache.get(key) if key else None
+    if vec is None:
+        vec = embed_texts([text])[0]
+        if key:
+            _disk_cache.put(key, vec)
+    vec.flags.writeable = False
+    return vec
+
+
+def warm_up():
+    """Load the model and run one embedding, so the first real query sees steady-state latency"""
+    embed_texts(["warmup"])
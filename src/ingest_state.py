@@ -0,0 +1,59 @@
+"""
+Ingest State
+The hash recorded by the CLI's last successful ingest (.ingest_hash) and the
+per-type chunks it saved for the MCP server's static tools. The chunks are
+stamped with that hash, so once another script changes the index (and clears
+the hash) readers see them as stale
+"""
+
+import os
+
+import orjson
+
+# Constants
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INGEST_HASH_FILE = os.path.join(ROOT_DIR, ".ingest_hash")
+BY_TYPE_FILE = os.path.join(ROOT_DIR, "digitaltwin_by_type.json")
+
+
+def read_ingest_hash() -> str | None:
+    """Hash recorded by the last successful ingest, or None"""
+    try:
+        with open(INGEST_HASH_FILE) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def write_ingest_hash(ingest_hash: str):
+    """Record a successful ingest, replacing the old hash atomically"""
+    tmp_path = f"{INGEST_HASH_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(ingest_hash)
+    os.replace(tmp_path, INGEST_HASH_FILE)
+
+
+def clear_ingest_hash():
+    """Forget the last ingest once another script has written to the index"""
+    try:
+        os.remove(INGEST_HASH_FILE)
+    except FileNotFoundError:
+        pass
+
+
+def save_chunks_by_type(by_type: dict[str, list[dict]], ingest_hash: str):
+    """Write the per-type chunks, stamped with the ingest that produced them"""
+    tmp_path = f"{BY_TYPE_FILE}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps({"ingest_hash": ingest_hash, "chunks": by_type}))
+    os.replace(tmp_path, BY_TYPE_FILE)
+
+
+def load_chunks_by_type() -> tuple[str | None, dict[str, list[dict]]]:
+    """The saved per-type chunks and their ingest hash, or (None, {}) if there are none"""
+    try:
+        with open(BY_TYPE_FILE, "rb") as f:
+            saved = orjson.loads(f.read())
+    except FileNotFoundError:
+        return None, {}
+    return saved["ingest_hash"], saved["chunks"]
@@ -0,0 +1,175 @@
+"""
+Local Vector Index
+In-process alternative to Upstash Vector (VECTOR_BACKEND=local)
+- Documents are embedded once at ingest with the local embedder, which must be
+  a real model (fastembed) unless ALLOW_HASHED_EMBEDDINGS is set
+- Queries are embedded locally and scored with one matrix-vector product
+- Vectors are stored as int8 with a per-dimension scale (4x smaller than float32)
+"""
+
+import os
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import orjson
+from upstash_vector.types import QueryResult
+
+from embeddings import MODEL_AVAILABLE, embed_text, embed_texts
+
+# Constants
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "upstash").lower()
+LOCAL_INDEX_PATH = os.getenv(
+    "LOCAL_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "local_index")
+)
+# The hashed fallback embedding retrieves poorly (for "work experience employment
+# history" it ranks salary_location.remote_experience first), so only on request
+ALLOW_HASHED_EMBEDDINGS = bool(os.getenv("ALLOW_HASHED_EMBEDDINGS"))
+
+
+def _quantize(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Scalar-quantize rows to int8 codes with one float32 scale per dimension"""
+    scale = np.abs(matrix).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+    return codes, scale.astype(np.float32)
+
+
+class LocalIndex:
+    """Exact cosine-similarity index with the same upsert/query/info shape as upstash_vector.Index"""
+
+    def __init__(self):
+        if not MODEL_AVAILABLE and not ALLOW_HASHED_EMBEDDINGS:
+            raise RuntimeError(
+                "VECTOR_BACKEND=local needs an embedding model: pip install -r requirements-local.txt "
+                "(or set ALLOW_HASHED_EMBEDDINGS=1 to use the hashed fallback anyway)"
+            )
+        self._ids: list[str] = []
+        self._data: list[str] = []
+        self._metadata: list[dict] = []
+        self._positions: dict[str, int] = {}
+        self._codes: np.ndarray | None = None
+        self._scale: np.ndarray | None = None
+        # Exact float32 rows, kept between upserts until the next save() so
+        # each refit quantizes the originals rather than earlier codes
+        self._vectors: np.ndarray | None = None
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors):
+        """Embed and store (id, data, metadata) tuples or {'id', 'data', 'metadata'} dicts"""
+        rows = [(v["id"], v["data"], v.get("metadata") or {}) if isinstance(v, dict) else v for v in vectors]
+        if not rows:
+            return
+        embeddings = embed_texts([data for _, data, _ in rows])
+
+        with self._lock:
+            # Apply the changes to the float32 rows, then refit the scales over
+            # every row. A loaded index starts from its codes, rounded only once
+            matrix = self._vectors if self._vectors is not None else self._dequantize()
+            new_rows = []
+            for (vector_id, data, metadata), embedding in zip(rows, embeddings):
+                pos = self._positions.get(vector_id)
+                if pos is None:
+                    self._positions[vector_id] = len(self._ids)
+                    self._ids.append(vector_id)
+                    self._data.append(data)
+                    self._metadata.append(metadata)
+                    new_rows.append(embedding)
+                else:
+                    self._data[pos] = data
+                    self._metadata[pos] = metadata
+                    matrix[pos] = embedding
+            if new_rows:
+                stacked = np.stack(new_rows)
+                matrix = stacked if matrix is None else np.concatenate([matrix, stacked])
+            self._vectors = matrix
+            self._codes, self._scale = _quantize(matrix)
+
+    def _dequantize(self) -> np.ndarray | None:
+        """Approximate float32 vectors from the stored codes"""
+        if self._codes is None:
+            return None
+        return self._codes * self._scale
+
+    def _results(self, scores: np.ndarray, top_k: int, include_metadata: bool, include_data: bool) -> list[QueryResult]:
+        """QueryResults for the top_k highest scores"""
+        top = np.argsort(-scores)[:top_k]
+        return [
+            QueryResult(
+                id=self._ids[i],
+                score=float(scores[i]),
+                metadata=self._metadata[i] if include_metadata else None,
+                data=self._data[i] if include_data else None
+            )
+            for i in top
+        ]
+
+    def _snapshot(self) -> tuple[np.ndarray | None, np.ndarray | None]:
+        """Codes and scales from the same upsert"""
+        with self._lock:
+            return self._codes, self._scale
+
+    def query(self, data: str, top_k: int = 10, include_metadata: bool = False, include_data: bool = False, **kwargs) -> list[QueryResult]:
+        """Return the top_k most similar documents to data"""
+        codes, scale = self._snapshot()
+        if codes is None:
+            return []
+        # codes @ (q * scale) == dequantized vectors @ q, without materializing them
+        scores = codes @ (embed_text(data) * scale)
+        return self._results(scores, top_k, include_metadata, include_data)
+
+    def query_many(self, queries: list[dict], **kwargs) -> list[list[QueryResult]]:
+        """Run several {'data', 'top_k', ...} queries with one embedding call and one matrix product"""
+        codes, scale = self._snapshot()
+        if codes is None:
+            return [[] for _ in queries]
+        embeddings = embed_texts([q["data"] for q in queries])
+        scores = (embeddings * scale) @ codes.T
+        return [
+            self._results(row, q.get("top_k", 10), q.get("include_metadata", False), q.get("include_data", False))
+            for q, row in zip(queries, scores)
+        ]
+
+    def info(self):
+        """Vector count and dimension, like Index.info()"""
+        return SimpleNamespace(
+            vector_count=len(self._ids),
+            dimension=0 if self._codes is None else self._codes.shape[1]
+        )
+
+    def save(self, path: str = LOCAL_INDEX_PATH):
+        """Write the index to path.npz (int8 codes and scales) and path.json (documents)
+
+        Drops the float32 rows afterwards, so the index in memory is the int8 one that was saved
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            if self._codes is None:
+                np.savez(f"{path}.npz", codes=np.zeros((0, 0), dtype=np.int8), scale=np.zeros(0, dtype=np.float32))
+            else:
+                np.savez(f"{path}.npz", codes=self._codes, scale=self._scale)
+            with open(f"{path}.json", "wb") as f:
+                f.write(orjson.dumps({"ids": self._ids, "data": self._data, "metadata": self._metadata}))
+            # The codes were fitted to these rows at the last upsert; later
+            # upserts start again from the dequantized codes
+            self._vectors = None
+
+    @classmethod
+    def load(cls, path: str = LOCAL_INDEX_PATH) -> "LocalIndex":
+        """Read an index written by save()"""
+        index = cls()
+        with open(f"{path}.json", "rb") as f:
+            documents = orjson.loads(f.read())
+        index._ids = documents["ids"]
+        index._data = documents["data"]
+        index._metadata = documents["metadata"]
+        index._positions = {vector_id: i for i, vector_id in enumerate(index._ids)}
+        if index._ids:
+            if os.path.exists(f"{path}.npz"):
+                with np.load(f"{path}.npz") as arrays:
+                    index._codes, index._scale = arrays["codes"], arrays["scale"]
+            else:
+                # Index saved before quantization: float32 vectors in path.npy
+                index._codes, index._scale = _quantize(np.load(f"{path}.npy"))
+        return index
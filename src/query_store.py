@@ -0,0 +1,95 @@
+"""
+Vector Query Store
+Persists vector query results in SQLite keyed by a SHA-256 of an index scope,
+top_k and the literal query, so repeat test runs of the same queries skip both
+the query embedding and the vector database round-trip
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable
+
+from upstash_vector.types import QueryResult
+
+# Constants
+VECDB_CACHE_PATH = os.getenv(
+    "VECDB_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "vecdb.sqlite")
+)
+VECDB_CACHE_TTL = int(os.getenv("VECDB_CACHE_TTL", "3600"))
+
+
+def cache_key(scope: str, query: str, top_k: int) -> str:
+    """Deterministic key for the top_k results of query on the index identified by scope"""
+    return hashlib.sha256(f"{scope}\0{top_k}\0{query}".encode("utf-8")).hexdigest()
+
+
+def dump_results(results: list) -> str:
+    """JSON for results, keeping only the fields the tools read"""
+    return json.dumps([
+        {"id": r.id, "score": r.score, "metadata": r.metadata, "data": r.data}
+        for r in results
+    ])
+
+
+def load_results(blob: str) -> list[QueryResult]:
+    """QueryResults back from dump_results JSON"""
+    return [QueryResult(**fields) for fields in json.loads(blob)]
+
+
+class QueryStore:
+    """SQLite-backed map from cache_key() to a list of query results, with a TTL"""
+
+    def __init__(self, scope: str = "", path: str = VECDB_CACHE_PATH, ttl: int = VECDB_CACHE_TTL):
+        self.scope = scope
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS queries (
+                key TEXT PRIMARY KEY,
+                results TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, query: str, top_k: int) -> list[QueryResult] | None:
+        """Return the stored results for query, if present and not expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results FROM queries WHERE key = ? AND created_at > ?",
+                (cache_key(self.scope, query, top_k), time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        return load_results(row[0])
+
+    def put(self, query: str, top_k: int, results: list):
+        """Store results for query; empty results are not stored"""
+        if not results:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM queries WHERE created_at <= ?", (now - self.ttl,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO queries (key, results, created_at) VALUES (?, ?, ?)",
+                (cache_key(self.scope, query, top_k), dump_results(results), now)
+            )
+            self._conn.commit()
+
+    def get_or_compute_many(self, queries: list[str], top_k: int, compute_many: Callable[[list[str]], list[list]]) -> list[list]:
+        """Return the stored results for each query, computing all the misses in one compute_many call and storing them"""
+        values = [self.get(query, top_k) for query in queries]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            computed = compute_many([queries[i] for i in missing])
+            for i, results in zip(missing, computed):
+                values[i] = results
+                self.put(queries[i], top_k, results)
+        return values
@@ -0,0 +1,116 @@
+"""
+Semantic Response Cache
+Persists Groq answers in SQLite keyed by the question embedding, so a
+reworded repeat of an earlier question is answered without calling the LLM.
+Answers are scoped to the ids of the chunks retrieved for them, so a similar
+question over different context is not served a stale answer, and to a
+namespace for the prompts that produced them, so callers with different
+system prompts, templates or token limits sharing the file don't serve each
+other's answers. Without an embedding model only the same question (see
+exact_key) is served
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from embeddings import MODEL_AVAILABLE, embed_text
+from semantic_cache import exact_key
+
+# Constants
+RESPONSE_CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "responses.sqlite")
+)
+RESPONSE_CACHE_MAX_DISTANCE = float(os.getenv("RESPONSE_CACHE_MAX_DISTANCE", "0.1"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def context_scope(context_ids) -> str:
+    """Order-independent key for the set of chunk ids an answer was generated from"""
+    return ",".join(sorted(set(context_ids)))
+
+
+def prompt_namespace(*parts) -> str:
+    """Short key for everything besides the question that shapes an answer (system prompt, templates, max_tokens)"""
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:16]
+
+
+class ResponseCache:
+    """SQLite-backed cache of LLM responses, matched by cosine distance per model (or by exact_key if not semantic)"""
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, max_distance: float = RESPONSE_CACHE_MAX_DISTANCE, ttl: int = RESPONSE_CACHE_TTL, semantic: bool = MODEL_AVAILABLE, namespace: str = ""):
+        self.max_distance = max_distance
+        self.semantic = semantic
+        self.ttl = ttl
+        self.namespace = namespace
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                question_embedding BLOB NOT NULL,
+                response TEXT NOT NULL,
+                model TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                scope TEXT NOT NULL DEFAULT '',
+                question TEXT NOT NULL DEFAULT '',
+                namespace TEXT NOT NULL DEFAULT ''
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "scope" not in columns:
+            # Caches written before answers were scoped
+            self._conn.execute("ALTER TABLE responses ADD COLUMN scope TEXT NOT NULL DEFAULT ''")
+        if "question" not in columns:
+            # Caches written before exact matching; their rows only serve semantic lookups
+            self._conn.execute("ALTER TABLE responses ADD COLUMN question TEXT NOT NULL DEFAULT ''")
+        if "namespace" not in columns:
+            # Caches written before namespacing; their rows only serve the default namespace
+            self._conn.execute("ALTER TABLE responses ADD COLUMN namespace TEXT NOT NULL DEFAULT ''")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_model ON responses (model, created_at)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, question: str, model: str, context_ids=()) -> str | None:
+        """Return the cached response to the closest question over the same context, if close enough"""
+        if not self.semantic:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response FROM responses WHERE namespace = ? AND model = ? AND scope = ? AND question = ? AND created_at > ? ORDER BY created_at DESC",
+                    (self.namespace, model, context_scope(context_ids), exact_key(question), time.time() - self.ttl)
+                ).fetchone()
+            return row[0] if row else None
+
+        vec = embed_text(question)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question_embedding, response FROM responses WHERE namespace = ? AND model = ? AND scope = ? AND created_at > ?",
+                (self.namespace, model, context_scope(context_ids), time.time() - self.ttl)
+            ).fetchall()
+        rows = [(blob, response) for blob, response in rows if len(blob) == vec.nbytes]
+        if not rows:
+            return None
+
+        matrix = np.frombuffer(b"".join(blob for blob, _ in rows), dtype=np.float32).reshape(len(rows), -1)
+        scores = matrix @ vec
+        best = int(np.argmax(scores))
+        if 1.0 - scores[best] > self.max_distance:
+            return None
+        return rows[best][1]
+
+    def put(self, question: str, model: str, response: str, context_ids=()):
+        """Store a response for later similar questions over the same context"""
+        # Without a model the embedding is left empty, so a later semantic lookup skips the row
+        embedding = embed_text(question).astype(np.float32).tobytes() if self.semantic else b""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+            self._conn.execute(
+                "INSERT INTO responses (question_embedding, response, model, created_at, scope, question, namespace) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (embedding, response, model, now, context_scope(context_ids), exact_key(question), self.namespace)
+            )
+            self._conn.commit()
@@ -0,0 +1,17 @@
+"""
+Query Result Helpers
+Shared by the CLI and the MCP server for reading Upstash (or local index) query results
+"""
+
+
+def result_content(result) -> str:
+    """Chunk text of a query result, recovered from its embedded data if metadata has no copy"""
+    metadata = result.metadata or {}
+    content = metadata.get('content')
+    if content:
+        return content
+    data = result.data or ''
+    title = metadata.get('title')
+    if title and data.startswith(f"{title}: "):
+        return data[len(title) + 2:]
+    return data
@@ -0,0 +1,127 @@
+"""
+Semantic Query Cache
+Serves repeated or reworded questions from memory instead of re-querying Upstash.
+Without an embedding model only repeats match: hashed embeddings score
+"...at Company A in 2023?" and "...at Company B in 2023?" as near-duplicates
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable
+
+import numpy as np
+
+from embeddings import MODEL_AVAILABLE, embed_text, embed_texts
+
+# Constants
+CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "256"))
+CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def exact_key(text: str) -> str:
+    """Key for exact matching: lowercased, whitespace collapsed"""
+    return " ".join(text.lower().split())
+
+
+class SemanticCache:
+    """LRU cache keyed by question embedding, matched by cosine similarity (or by exact_key if not semantic)"""
+
+    def __init__(self, threshold: float = CACHE_THRESHOLD, maxsize: int = CACHE_SIZE, ttl: int = CACHE_TTL, semantic: bool = MODEL_AVAILABLE):
+        self.threshold = threshold
+        self.semantic = semantic
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._vectors: list[np.ndarray | None] = []
+        self._keys: list[str] = []
+        self._namespaces: list[Any] = []
+        self._values: list[Any] = []
+        self._created: list[float] = []
+        self._last_used: list[float] = []
+        self._matrix: np.ndarray | None = None
+        self._lock = threading.Lock()
+
+    def _remove(self, i: int):
+        for column in (self._vectors, self._keys, self._namespaces, self._values, self._created, self._last_used):
+            del column[i]
+        self._matrix = None
+
+    def _expire(self, now: float):
+        for i in range(len(self._created) - 1, -1, -1):
+            if now - self._created[i] > self.ttl:
+                self._remove(i)
+
+    def _lookup(self, vec: np.ndarray | None, key: str, namespace: Any, now: float):
+        self._expire(now)
+        if not self._vectors:
+            return None
+        if not self.semantic:
+            for i, (k, ns) in enumerate(zip(self._keys, self._namespaces)):
+                if k == key and ns == namespace:
+                    self._last_used[i] = now
+                    return self._values[i]
+            return None
+        if self._matrix is None:
+            self._matrix = np.stack(self._vectors)
+        scores = self._matrix @ vec
+        for i, ns in enumerate(self._namespaces):
+            if ns != namespace:
+                scores[i] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        self._last_used[best] = now
+        return self._values[best]
+
+    def _insert(self, vec: np.ndarray | None, key: str, namespace: Any, value: Any, now: float):
+        if len(self._vectors) >= self.maxsize:
+            self._remove(int(np.argmin(self._last_used)))
+        self._vectors.append(vec)
+        self._keys.append(key)
+        self._namespaces.append(namespace)
+        self._values.append(value)
+        self._created.append(now)
+        self._last_used.append(now)
+        self._matrix = None
+
+    def get_or_compute(self, text: str, compute: Callable[[], Any], namespace: Any = "") -> Any:
+        """Return the cached value for a similar text, or compute and cache it"""
+        vec = embed_text(text) if self.semantic else None
+        with self._lock:
+            value = self._lookup(vec, exact_key(text), namespace, time.time())
+        if value is not None:
+            return value
+
+        value = compute()
+        if value:
+            with self._lock:
+                self._insert(vec, exact_key(text), namespace, value, time.time())
+        return value
+
+    def get_or_compute_many(self, texts: list[str], compute_many: Callable[[list[str]], list[Any]], namespace: Any = "") -> list[Any]:
+        """Like get_or_compute for several texts, computing all the misses in one compute_many call"""
+        vecs = embed_texts(texts) if self.semantic else [None] * len(texts)
+        keys = [exact_key(text) for text in texts]
+        with self._lock:
+            now = time.time()
+            values = [self._lookup(vec, key, namespace, now) for vec, key in zip(vecs, keys)]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if not missing:
+            return values
+
+        computed = compute_many([texts[i] for i in missing])
+        with self._lock:
+            now = time.time()
+            for i, value in zip(missing, computed):
+                values[i] = value
+                if value:
+                    self._insert(vecs[i], keys[i], namespace, value, now)
+        return values
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            for column in (self._vectors, self._keys, self._namespaces, self._values, self._created, self._last_used):
+                column.clear()
+            self._matrix = None
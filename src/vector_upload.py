@@ -0,0 +1,135 @@
+"""
+Vector Upload Helpers
+Batching, retry and fallback logic for upserting chunks into Upstash Vector,
+shared by embed_all_data.py, embed_digitaltwin.py and the CLI ingest
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+from itertools import islice
+from typing import Callable
+
+import httpx
+from upstash_vector import AsyncIndex
+
+# Constants
+BATCH_SIZE = int(os.getenv('UPSTASH_BATCH_SIZE', '32'))
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.25
+UPLOAD_CONCURRENCY = int(os.getenv('UPSTASH_CONCURRENCY', '8'))
+# Chunks are length-sorted within windows of this many so batches hold similar-sized texts
+SORT_WINDOW = BATCH_SIZE * UPLOAD_CONCURRENCY
+# Per-chunk success lines only when VERBOSE is set; otherwise one line per batch
+VERBOSE = bool(os.getenv('VERBOSE'))
+
+# A 429 status as a whole number, not any error text that happens to contain the digits
+THROTTLED_RE = re.compile(r"\b429\b|rate limit|too many requests")
+
+
+def create_upload_index(url: str, token: str) -> AsyncIndex:
+    """AsyncIndex for bulk upserts, with the SDK's own retries off so upsert_with_retry is the only retry layer"""
+    return AsyncIndex(url=url, token=token, retries=0)
+
+
+def batched(iterable, n):
+    """Yield successive lists of up to n items from iterable"""
+    it = iter(iterable)
+    while batch := list(islice(it, n)):
+        yield batch
+
+
+def sort_by_length(chunks, text: Callable, window: int = SORT_WINDOW):
+    """Reorder chunks by len(text(chunk)) within consecutive windows, keeping the stream lazy"""
+    for group in batched(chunks, window):
+        group.sort(key=lambda chunk: len(text(chunk)))
+        yield from group
+
+
+def is_retryable(error):
+    """True for transient failures: throttling, network errors, or a non-JSON (5xx) response"""
+    if isinstance(error, (httpx.TransportError, json.JSONDecodeError)):
+        return True
+    return THROTTLED_RE.search(str(error).lower()) is not None
+
+
+async def upsert_with_retry(index, vectors):
+    """Upsert, retrying transient failures with jittered exponential backoff"""
+    # The SDK surfaces no status code or Retry-After header, so back off blind
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            return await index.upsert(vectors=vectors)
+        except Exception as e:
+            if attempt == RETRY_ATTEMPTS - 1 or not is_retryable(e):
+                raise
+            await asyncio.sleep(2 ** attempt * RETRY_BASE_DELAY + random.random() * 0.1)
+
+
+async def upload_batch(index, batch, batch_num, to_vector: Callable, label: Callable):
+    """Upsert one batch, falling back to per-item upserts; returns (successful, failed)"""
+    # One request for the whole batch
+    try:
+        await upsert_with_retry(index, [to_vector(chunk) for chunk in batch])
+        if VERBOSE:
+            for chunk in batch:
+                print(f"  ✓ {label(chunk)}")
+        print(f"[Upstash] Batch {batch_num}: {len(batch)} ok")
+        return len(batch), 0
+    except Exception as e:
+        print(f"  ! Batch {batch_num} upsert failed ({str(e)}), retrying items one by one")
+
+    # Fall back to per-item upserts so one bad chunk doesn't sink the batch
+    successful = 0
+    failed = 0
+    for chunk in batch:
+        try:
+            await upsert_with_retry(index, [to_vector(chunk)])
+            successful += 1
+            if VERBOSE:
+                print(f"  ✓ {label(chunk)}")
+        except Exception as e:
+            failed += 1
+            print(f"  ✗ {label(chunk)}: {str(e)}")
+    print(f"[Upstash] Batch {batch_num}: {successful} ok, {failed} failed")
+    return successful, failed
+
+
+async def upload_chunks(index, chunks, text: Callable, to_vector: Callable, label: Callable):
+    """Upload chunks in length-sorted batches, several in flight at once; returns (successful, failed)"""
+    # Keep up to UPLOAD_CONCURRENCY batches in flight; the next batch is only
+    # built once a slot frees up, so chunks stream straight from the generator
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+    async def bounded(batch, batch_num):
+        try:
+            return await upload_batch(index, batch, batch_num, to_vector, label)
+        finally:
+            semaphore.release()
+
+    tasks = []
+    for batch_num, batch in enumerate(batched(sort_by_length(chunks, text), BATCH_SIZE), 1):
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(bounded(batch, batch_num)))
+
+    results = await asyncio.gather(*tasks)
+    return sum(ok for ok, _ in results), sum(bad for _, bad in results)
+
+
+def upsert_batch(index, batch):
+    """Upsert one batch of (id, data, metadata) tuples on a sync index, retrying item by item if the batch is rejected; returns the failed ids"""
+    try:
+        index.upsert(vectors=batch)
+        return []
+    except Exception as e:
+        print(f"⚠️ Batch of {len(batch)} failed ({str(e)}), retrying one by one")
+
+    failed = []
+    for vector in batch:
+        try:
+            index.upsert(vectors=[vector])
+        except Exception as e:
+            print(f"❌ Failed to upload {vector[0]}: {str(e)}")
+            failed.append(vector[0])
+    return failed
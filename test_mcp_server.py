@@ -2,170 +2,287 @@
 """
 Test script for Digital Twin MCP Server
 Tests all available tools without needing Claude Desktop
+
+Run directly (python test_mcp_server.py), or under pytest with the
+fixtures in conftest.py (pip install -r requirements-dev.txt, then
+pytest test_mcp_server.py, add -n auto to spread the tests over workers)
 """
 
+import asyncio
+import contextvars
+import io
 import os
+import string
 import sys
+from contextlib import contextmanager
+from functools import partial
+from operator import attrgetter
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Bound every HTTP read (the first byte, and any stall mid-stream), for both
+# the vector and the Groq calls, before the shared clients are built. The Groq and Upstash SDKs retry timeouts and
+# transient errors themselves, before a response starts, so no token is echoed twice
+CALL_TIMEOUT = os.getenv("TEST_CALL_TIMEOUT", "8")
+os.environ.setdefault("HTTP_READ_TIMEOUT", CALL_TIMEOUT)
+os.environ.setdefault("GROQ_READ_TIMEOUT", CALL_TIMEOUT)
+# The test prompts differ from the tools' own, so their answers are cached
+# apart from the server's response cache rather than served to real tool calls
+os.environ.setdefault(
+    "RESPONSE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "test_responses.sqlite")
+)
+
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from digital_twin_mcp_server import (
-    query_vector_db,
-    generate_response,
+    fetch_vector_db_batch,
+    result_content,
+    unique_results,
+    astream_response_with_usage,
     vector_index,
-    groq_client
+    async_groq_client
 )
+from ingest_state import read_ingest_hash
+from local_index import LOCAL_INDEX_PATH, VECTOR_BACKEND
+from query_store import QueryStore
 
-def test_connection():
-    """Test connections to Upstash and Groq"""
-    print("🔍 Testing Connections...")
-    print("-" * 50)
+QUESTION = "What are your main technical skills?"
+
+# Tool name -> (vector query, top_k); every query goes to the vector database in one request
+TEST_QUERIES = {
+    "query_digital_twin": (QUESTION, 3),
+    "get_technical_skills": ("technical skills programming languages frameworks", 2),
+    "get_work_experience": ("work experience employment history", 3),
+    "get_projects": ("projects portfolio applications built", 4),
+    "analyze_job_fit": ("skills experience React Next.js TypeScript AWS cloud", 5)
+}
+
+# Retrieval-only tools -> (icon, label, plural, per-result line); one probe body checks them all.
+# Line fields: i, title, type, category, score, content
+PROBES = {
+    "get_technical_skills": ("⚙️", "skill", "skills", "{i}. {title}\n   {content:.150}...\n"),
+    "get_work_experience": ("💼", "experience", "experience", "{i}. {title} (type: {type}, score: {score:.3f})"),
+    "get_projects": ("🚀", "project", "projects", "{i}. {title} (category: {category})")
+}
+
+# Prompt templates, parsed once; the fixed text leads so Groq can cache the prefix
+QUERY_PROMPT = string.Template("""Based on the following information, answer the question.
+
+Information:
+$context
+
+Question: $question
+
+Answer:""")
+
+JOB_FIT_PROMPT = string.Template("""Analyze how well this profile matches the job description.
+
+Provide a brief analysis with:
+1. Key matching skills
+2. Overall fit score (1-10)
+
+Profile Information:
+$context
+
+Job Description:
+$job_description
+
+Analysis:""")
+
+# The tests run concurrently, so each prints into its own buffer and the
+# buffers are replayed in order once all have finished
+test_output = contextvars.ContextVar("test_output", default=None)
+
+class OutputRouter(io.TextIOBase):
+    """stdout stand-in that writes to the running test's buffer, if any"""
     
-    # Test Upstash
+    def __init__(self, stream):
+        self.stream = stream
+    
+    def write(self, text):
+        return (test_output.get() or self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+
+@contextmanager
+def routed_stdout():
+    """Install OutputRouter as sys.stdout for the duration of the block"""
+    stdout = sys.stdout
+    sys.stdout = OutputRouter(stdout)
     try:
-        info = vector_index.info()
-        vector_count = getattr(info, 'vector_count', 0)
-        print(f"✅ Upstash Vector: Connected ({vector_count} vectors)")
-    except Exception as e:
-        print(f"❌ Upstash Vector: Failed - {e}")
-        return False
+        yield
+    finally:
+        sys.stdout = stdout
+
+@contextmanager
+def captured_stdout():
+    """Send this task's prints (under routed_stdout) to a fresh buffer"""
+    buffer = io.StringIO()
+    token = test_output.set(buffer)
+    try:
+        yield buffer
+    finally:
+        test_output.reset(token)
+
+get_metadata_and_score = attrgetter('metadata', 'score')
+
+def describe(result):
+    """(title, type, category, score) of a result, 'Unknown' for missing metadata"""
+    metadata, score = get_metadata_and_score(result)
+    if not metadata:
+        return 'Unknown', 'Unknown', 'Unknown', score
+    get = metadata.get
+    return get('title', 'Unknown'), get('type', 'Unknown'), get('category', 'Unknown'), score
+
+def build_context(results, limit, separator, ellipsis=""):
+    """Join each result's content, truncated to limit characters, in a single pass"""
+    contents = (result_content(result) for result in results)
+    return separator.join(f"{content[:limit]}{ellipsis}" for content in contents if content)
+
+def index_scope():
+    """Identity of the vector index and of its last ingest, so results stored before a re-ingest miss"""
+    if VECTOR_BACKEND == "local":
+        local_file = f"{LOCAL_INDEX_PATH}.json"
+        parts = [LOCAL_INDEX_PATH, str(os.path.getmtime(local_file)) if os.path.exists(local_file) else ""]
+    else:
+        parts = [os.getenv("UPSTASH_VECTOR_REST_URL", "")]
+    parts.append(read_ingest_hash() or "")
+    return "\0".join([VECTOR_BACKEND, *parts])
+
+# The probe strings are constant, so repeat runs read their results from disk
+query_store = QueryStore(scope=index_scope())
+
+def fetch_test_results():
+    """Run every test's vector query in one batch; returns {tool name: results}, raising on failure"""
+    # A shorter top_k is a prefix of the longest one, so query once at the max and slice
+    queries = [query for query, _ in TEST_QUERIES.values()]
+    max_top_k = max(top_k for _, top_k in TEST_QUERIES.values())
+    result_sets = query_store.get_or_compute_many(
+        queries, max_top_k, lambda missing: fetch_vector_db_batch(missing, max_top_k)
+    )
+    return {
+        name: result_set[:top_k]
+        for (name, (_, top_k)), result_set in zip(TEST_QUERIES.items(), result_sets)
+    }
+
+async def stream_response(prompt, cache_key, results):
+    """Generate a response, echoing its tokens into this test's output as they arrive; returns the usage
     
-    # Test Groq
+    Fails the test unless a real answer came back
+    """
+    streamed = []
+    
+    def echo(token):
+        streamed.append(token)
+        sys.stdout.write(token)
+    
+    response, usage = await astream_response_with_usage(
+        prompt, cache_key=cache_key, context_ids=[r.id for r in results], on_token=echo
+    )
+    # A cached answer arrives whole
+    if not streamed:
+        sys.stdout.write(response)
+    print("\n")
+    assert response.strip(), "❌ Empty response from Groq"
+    assert not response.startswith("Error generating response"), f"❌ {response}"
+    return usage
+
+def print_cache_usage(usage):
+    """Report how much of the prompt Groq served from its prompt cache"""
+    prompt_tokens = usage["prompt_tokens"]
+    if prompt_tokens:
+        cached = usage["cached_tokens"]
+        print(f"🧮 Prompt tokens: {prompt_tokens}, cached: {cached} (cache hit rate: {cached / prompt_tokens:.1%})\n")
+    else:
+        print("🧮 No Groq token usage (cached answer or failed call)\n")
+
+async def check_upstash():
+    """Probe Upstash; returns (ok, message)"""
     try:
-        response = groq_client.chat.completions.create(
+        info = await asyncio.to_thread(vector_index.info)
+        vector_count = info.vector_count
+        return True, f"✅ Upstash Vector: Connected ({vector_count} vectors)"
+    except Exception as e:
+        return False, f"❌ Upstash Vector: Failed - {e}"
+
+async def check_groq():
+    """Probe Groq; returns (ok, message)"""
+    try:
+        await async_groq_client.chat.completions.create(
             model="llama-3.1-8b-instant",
             messages=[{"role": "user", "content": "Say 'OK'"}],
             max_tokens=10
         )
-        print(f"✅ Groq: Connected")
+        return True, "✅ Groq: Connected"
     except Exception as e:
-        print(f"❌ Groq: Failed - {e}")
-        return False
+        return False, f"❌ Groq: Failed - {e}"
+
+async def test_connection():
+    """Test connections to Upstash and Groq"""
+    print("🔍 Testing Connections...")
+    print("-" * 50)
+    
+    # Both probes at once, so this takes as long as the slower one
+    checks = await asyncio.gather(check_upstash(), check_groq())
+    for _, message in checks:
+        print(message)
     
+    assert all(ok for ok, _ in checks), "❌ Connection tests failed. Check your .env file."
     print()
-    return True
 
-def test_query_digital_twin():
+async def test_query_digital_twin(results):
     """Test the query_digital_twin tool"""
     print("🤖 Testing: query_digital_twin")
     print("-" * 50)
     
-    question = "What are your main technical skills?"
+    question = QUESTION
     print(f"Question: {question}\n")
     
-    # Query vector database
-    results = query_vector_db(question, top_k=3)
-    
-    if not results:
-        print("❌ No results from vector database")
-        return False
+    assert results, "❌ No results from vector database"
     
     print(f"Found {len(results)} relevant chunks:")
     for i, result in enumerate(results, 1):
-        metadata = result.metadata or {}
-        title = metadata.get('title', 'Unknown')
-        score = result.score
+        title, _, _, score = describe(result)
         print(f"  {i}. {title} (score: {score:.3f})")
     
-    # Extract context
-    context_parts = []
-    for result in results:
-        metadata = result.metadata or {}
-        content = metadata.get('content', '')
-        if content:
-            context_parts.append(content[:100] + "...")
-    
-    context = "\n\n".join(context_parts)
+    # Extract context, each chunk once
+    results = unique_results(results)
+    context = build_context(results, limit=100, separator="\n\n", ellipsis="...")
     
     # Generate response
-    prompt = f"""Based on the following information, answer the question.
-
-Information:
-{context}
-
-Question: {question}
-
-Answer:"""
+    prompt = QUERY_PROMPT.substitute(context=context, question=question)
     
     print("\n💭 Generating response...")
-    response = generate_response(prompt)
-    print(f"\n📝 Response:\n{response}\n")
-    
-    return True
-
-def test_get_technical_skills():
-    """Test getting technical skills"""
-    print("⚙️ Testing: get_technical_skills")
-    print("-" * 50)
-    
-    results = query_vector_db("technical skills programming languages frameworks", top_k=2)
-    
-    if not results:
-        print("❌ No skills found")
-        return False
-    
-    print(f"✅ Found {len(results)} skill-related chunks\n")
-    
-    for i, result in enumerate(results, 1):
-        metadata = result.metadata or {}
-        title = metadata.get('title', 'Unknown')
-        content = metadata.get('content', '')
-        print(f"{i}. {title}")
-        print(f"   {content[:150]}...\n")
-    
-    return True
-
-def test_get_work_experience():
-    """Test getting work experience"""
-    print("💼 Testing: get_work_experience")
-    print("-" * 50)
-    
-    results = query_vector_db("work experience employment history", top_k=3)
-    
-    if not results:
-        print("❌ No experience found")
-        return False
-    
-    print(f"✅ Found {len(results)} experience-related chunks\n")
-    
-    for i, result in enumerate(results, 1):
-        metadata = result.metadata or {}
-        title = metadata.get('title', 'Unknown')
-        result_type = metadata.get('type', 'Unknown')
-        score = result.score
-        print(f"{i}. {title} (type: {result_type}, score: {score:.3f})")
-    
-    print()
-    return True
+    # Keyed by the question (in the test cache), so repeat runs reuse the answer
+    print("\n📝 Response:")
+    usage = await stream_response(prompt, question, results)
+    print_cache_usage(usage)
 
-def test_get_projects():
-    """Test getting projects"""
-    print("🚀 Testing: get_projects")
+async def test_probe(tool, results):
+    """Test one retrieval-only tool against its slice of the shared batch"""
+    icon, label, plural, line = PROBES[tool]
+    print(f"{icon} Testing: {tool}")
     print("-" * 50)
     
-    results = query_vector_db("projects portfolio applications built", top_k=4)
-    
-    if not results:
-        print("❌ No projects found")
-        return False
+    assert results, f"❌ No {plural} found"
     
-    print(f"✅ Found {len(results)} project-related chunks\n")
+    print(f"✅ Found {len(results)} {label}-related chunks\n")
     
     for i, result in enumerate(results, 1):
-        metadata = result.metadata or {}
-        title = metadata.get('title', 'Unknown')
-        category = metadata.get('category', 'Unknown')
-        print(f"{i}. {title} (category: {category})")
+        title, result_type, category, score = describe(result)
+        print(line.format(
+            i=i, title=title, type=result_type, category=category,
+            score=score, content=result_content(result)
+        ))
     
     print()
-    return True
 
-def test_analyze_job_fit():
+async def test_analyze_job_fit(results):
     """Test job fit analysis"""
     print("🎯 Testing: analyze_job_fit")
     print("-" * 50)
@@ -181,45 +298,35 @@ def test_analyze_job_fit():
     
     print(f"Job Description:\n{job_description}\n")
     
-    # Query for relevant information
-    results = query_vector_db(f"skills experience React Next.js TypeScript AWS cloud", top_k=5)
-    
-    if not results:
-        print("❌ No matching skills found")
-        return False
+    assert results, "❌ No matching skills found"
     
     print(f"✅ Found {len(results)} matching skills/experiences")
     
-    context_parts = []
-    for result in results:
-        metadata = result.metadata or {}
-        content = metadata.get('content', '')
-        if content:
-            context_parts.append(content[:200])
-    
-    context = "\n".join(context_parts)
+    results = unique_results(results)
+    context = build_context(results, limit=200, separator="\n")
     
-    prompt = f"""Analyze how well this profile matches the job description.
-
-Profile Information:
-{context}
-
-Job Description:
-{job_description}
-
-Provide a brief analysis with:
-1. Key matching skills
-2. Overall fit score (1-10)
-
-Analysis:"""
+    prompt = JOB_FIT_PROMPT.substitute(context=context, job_description=job_description)
     
     print("\n💭 Generating job fit analysis...")
-    analysis = generate_response(prompt)
-    print(f"\n📊 Analysis:\n{analysis}\n")
-    
-    return True
+    print("\n📊 Analysis:")
+    usage = await stream_response(prompt, job_description, results)
+    print_cache_usage(usage)
+
+async def run_test(test_func, results):
+    """Run one test with its output captured; returns (passed, output)"""
+    with captured_stdout() as buffer:
+        try:
+            await test_func(results)
+            passed = True
+        except AssertionError as e:
+            print(f"{e}\n")
+            passed = False
+        except Exception as e:
+            print(f"❌ Test failed with error: {e or type(e).__name__}\n")
+            passed = False
+    return passed, buffer.getvalue()
 
-def main():
+async def main():
     """Run all tests"""
     print("=" * 50)
     print("🧪 Digital Twin MCP Server Tests")
@@ -227,30 +334,35 @@ def main():
     print()
     
     # Test connection first
-    if not test_connection():
-        print("\n❌ Connection tests failed. Check your .env file.")
+    try:
+        await test_connection()
+    except AssertionError as e:
+        print(f"\n{e}")
         return
     
-    tests = [
-        test_query_digital_twin,
-        test_get_technical_skills,
-        test_get_work_experience,
-        test_get_projects,
-        test_analyze_job_fit
-    ]
+    # Tool name -> test; the retrieval-only tools share one probe
+    tests = {
+        "query_digital_twin": test_query_digital_twin,
+        **{tool: partial(test_probe, tool) for tool in PROBES},
+        "analyze_job_fit": test_analyze_job_fit
+    }
+    try:
+        result_sets = await asyncio.to_thread(fetch_test_results)
+    except Exception as e:
+        print(f"\n❌ Vector query failed: {e or type(e).__name__}")
+        return
     
-    passed = 0
-    failed = 0
+    # The tests are independent round-trips, so overlap them
+    with routed_stdout():
+        results = await asyncio.gather(*(
+            run_test(test_func, result_sets[tool])
+            for tool, test_func in tests.items()
+        ))
     
-    for test_func in tests:
-        try:
-            if test_func():
-                passed += 1
-            else:
-                failed += 1
-        except Exception as e:
-            print(f"❌ Test failed with error: {e}\n")
-            failed += 1
+    # Every test's log in order, in one write
+    sys.stdout.write("".join(output for _, output in results))
+    passed = sum(ok for ok, _ in results)
+    failed = len(results) - passed
     
     print("=" * 50)
     print(f"📊 Test Results: {passed} passed, {failed} failed")
@@ -266,4 +378,4 @@ def main():
         print("\n⚠️ Some tests failed. Please check the errors above.")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())